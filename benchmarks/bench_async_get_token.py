@@ -0,0 +1,97 @@
+"""Benchmark AsyncMSAL.async_get_token with a warm token cache.
+
+Every iteration creates a new AsyncMSAL for the session, like msal_session does
+for every request. Tenant discovery is patched out, so the numbers exclude the
+network round trip a real ConfidentialClientApplication construction would add.
+
+    uv run python benchmarks/bench_async_get_token.py
+"""
+
+import asyncio
+import base64
+import json
+import time
+from typing import Any
+from unittest.mock import patch
+
+from msal import SerializableTokenCache
+
+from aiohttp_msal.msal_async import AsyncMSAL
+from aiohttp_msal.settings import ENV
+
+AUTHORITY = "https://login.microsoftonline.com/tid"
+OPENID_CONFIG = {
+    "authorization_endpoint": f"{AUTHORITY}/oauth2/v2.0/authorize",
+    "token_endpoint": f"{AUTHORITY}/oauth2/v2.0/token",
+    "issuer": f"{AUTHORITY}/v2.0",
+}
+DURATION = 3.0
+CONCURRENCY = 20
+
+
+def _b64(data: dict[str, Any]) -> str:
+    return base64.urlsafe_b64encode(json.dumps(data).encode()).decode().rstrip("=")
+
+
+def token_cache_blob() -> str:
+    """Return a serialized token cache with a valid access token."""
+    now = int(time.time())
+    claims = {
+        "aud": ENV.SP_APP_ID,
+        "iss": OPENID_CONFIG["issuer"],
+        "oid": "uid",
+        "tid": "tid",
+        "preferred_username": "j@k",
+        "iat": now,
+        "exp": now + 3600,
+    }
+    cache = SerializableTokenCache()
+    cache.add(
+        {
+            "client_id": ENV.SP_APP_ID,
+            "scope": AsyncMSAL.default_scopes,
+            "token_endpoint": OPENID_CONFIG["token_endpoint"],
+            "response": {
+                "access_token": "at",
+                "refresh_token": "rt",
+                "expires_in": 3600,
+                "token_type": "Bearer",
+                "client_info": _b64({"uid": "uid", "utid": "tid"}),
+                "id_token": f"x.{_b64(claims)}.x",
+            },
+        }
+    )
+    return cache.serialize()
+
+
+async def run(concurrency: int) -> float:
+    """Return async_get_token calls per second."""
+    blob = token_cache_blob()
+    count = 0
+    end = time.perf_counter() + DURATION
+
+    async def worker() -> None:
+        nonlocal count
+        while time.perf_counter() < end:
+            ses = AsyncMSAL({AsyncMSAL.token_cache_key: blob})
+            assert await ses.async_get_token()
+            count += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return count / (time.perf_counter() - start)
+
+
+def main() -> None:
+    """Run the benchmark."""
+    ENV.SP_APP_ID = "cid"
+    ENV.SP_APP_PW = "pw"
+    ENV.SP_AUTHORITY = AUTHORITY
+    with patch("msal.authority.tenant_discovery", return_value=OPENID_CONFIG):
+        for conc in (1, CONCURRENCY):
+            rate = asyncio.run(run(conc))
+            print(f"async_get_token concurrency={conc:<3} {rate:10.0f} req/s")
+
+
+if __name__ == "__main__":
+    main()
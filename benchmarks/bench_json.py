@@ -0,0 +1,55 @@
+"""Benchmark JSON backends on a representative Redis session payload.
+
+Compares the stdlib str path used before (bytes.decode + json.loads,
+json.dumps + str.encode) with the bytes-native ENV.json_* functions, which use
+orjson when it is installed.
+
+    uv run python benchmarks/bench_json.py
+"""
+
+import json
+import timeit
+from typing import Any
+
+from bench_async_get_token import token_cache_blob
+
+from aiohttp_msal.settings import ENV, orjson
+
+NUMBER = 20000
+
+
+def session_payload() -> dict[str, Any]:
+    """Return a session as stored by RedisStorage."""
+    return {
+        "created": 1700000000,
+        "session": {
+            "mail": "john.doe@example.com",
+            "name": "John Doe",
+            "m_mail": "jane.roe@example.com",
+            "m_name": "Jane Roe",
+            "token_cache": token_cache_blob(),
+        },
+    }
+
+
+def bench(name: str, stmt: Any) -> None:
+    """Print microseconds per call."""
+    usec = timeit.timeit(stmt, number=NUMBER) / NUMBER * 1e6
+    print(f"{name:<40} {usec:8.2f} us")
+
+
+def main() -> None:
+    """Run the benchmark."""
+    ENV.SP_APP_ID = "cid"
+    payload = session_payload()
+    raw = json.dumps(payload).encode()
+    print(f"payload {len(raw)} bytes, orjson {'installed' if orjson else 'missing'}")
+
+    bench("stdlib loads(bytes.decode())", lambda: json.loads(raw.decode()))
+    bench("ENV.json_loads(bytes)", lambda: ENV.json_loads(raw))
+    bench("stdlib dumps().encode()", lambda: json.dumps(payload).encode())
+    bench("ENV.json_dumpb()", lambda: ENV.json_dumpb(payload))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,7 @@
 """aiohttp_msal."""
 
 import logging
-from collections.abc import Awaitable, Callable
+from collections.abc import AsyncGenerator, Awaitable, Callable
 from functools import wraps
 from inspect import getfullargspec, iscoroutinefunction
 from typing import cast
@@ -10,6 +10,7 @@ from aiohttp import ClientSession, web
 from aiohttp_session import get_session
 from aiohttp_session import setup as _setup
 
+from aiohttp_msal.client import create_client_session, warm_client_session
 from aiohttp_msal.msal_async import AsyncMSAL
 from aiohttp_msal.settings import ENV
 from aiohttp_msal.utils import retry
@@ -86,15 +87,26 @@ def auth_or(
 
 async def app_init_redis_session(
     app: web.Application,
-    max_age: int = 3600 * 24 * 90,
+    max_age: int | None = None,
     check_proxy_cb: Callable[[], Awaitable[None]] | None = None,
 ) -> None:
     """Init an aiohttp_session with Redis storage helper.
 
+    Sessions expire max_age seconds after creation. max_age is stored in
+    ENV.SESSION_MAX_AGE, also used for sessions saved by the Redis tools.
     You can initialize your own aiohttp_session & storage provider.
     """
-    from aiohttp_session import redis_storage
-    from redis.asyncio import from_url
+    from aiohttp_msal.codec import FORMATS, RedisStorage, decode_session, encode_session
+    from aiohttp_msal.redis_tools import redis_from_url
+
+    if ENV.SESSION_COMPRESSION and ENV.SESSION_COMPRESSION not in FORMATS:
+        raise ValueError(
+            f"Unknown SESSION_COMPRESSION {ENV.SESSION_COMPRESSION}, "
+            f"expected one of {', '.join(FORMATS)}"
+        )
+
+    if max_age:
+        ENV.SESSION_MAX_AGE = max_age
 
     if check_proxy_cb:
         await check_proxy_cb()
@@ -104,26 +116,40 @@ async def app_init_redis_session(
     if ENV.database is None:
         _LOG.info("Connect to Redis %s", ENV.REDIS)
         try:
-            ENV.database = from_url(ENV.REDIS)
+            ENV.database = redis_from_url(ENV.REDIS)
             # , encoding="utf-8", decode_responses=True
         except ConnectionRefusedError as err:
             raise ConnectionError("Could not connect to REDIS server") from err
 
-    storage = redis_storage.RedisStorage(
+    storage = RedisStorage(
         ENV.database,
-        max_age=max_age,
+        max_age=ENV.SESSION_MAX_AGE,
         path="/",
         samesite="None",
         httponly=True,
         secure=True,
         domain=ENV.DOMAIN,
         cookie_name=ENV.COOKIE_NAME,
-        encoder=ENV.json_dumps,
-        decoder=ENV.json_loads,
+        encoder=encode_session,  # type: ignore[arg-type]
+        decoder=decode_session,
     )
     _setup(app, storage)
 
 
+async def client_session_ctx(_: web.Application) -> AsyncGenerator[None]:
+    """Manage AsyncMSAL.client_session for the lifetime of the app.
+
+    app.cleanup_ctx.append(client_session_ctx)
+    """
+    AsyncMSAL.client_session = cses = create_client_session()
+    await warm_client_session(cses)
+    try:
+        yield
+    finally:
+        AsyncMSAL.client_session = None
+        await cses.close()
+
+
 @retry
 async def check_proxy() -> None:
     """Test if we have Internet connectivity through proxies etc."""
@@ -0,0 +1,169 @@
+"""Circuit breakers for outgoing requests, per host."""
+
+import logging
+import threading
+import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from enum import StrEnum
+from typing import Any
+
+from aiohttp import web
+
+from aiohttp_msal.settings import ENV
+
+_LOG = logging.getLogger(__name__)
+
+
+class State(StrEnum):
+    """Circuit breaker state."""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
+@dataclass
+class CircuitBreaker:
+    """Fail fast while a host is down.
+
+    Opens after `threshold` consecutive failures. Calls are rejected with HTTP 503
+    until `cooldown` seconds have passed, then a single trial call is allowed
+    (half open): success closes the circuit, failure opens it again.
+    Thread safe, get_token runs in the MSAL executor.
+    """
+
+    name: str
+    threshold: int = 5
+    cooldown: float = 30
+    state: State = State.CLOSED
+    failures: int = 0
+    """Consecutive failures."""
+    opened_at: float = 0
+    opened: int = 0
+    """Times the circuit opened."""
+    rejected: int = 0
+    _trial: bool = field(default=False, repr=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def allow(self) -> None:
+        """Raise HTTPServiceUnavailable if the call is not allowed."""
+        with self._lock:
+            if self.state is State.OPEN:
+                wait = self.opened_at + self.cooldown - time.monotonic()
+                if wait > 0:
+                    self.rejected += 1
+                    raise web.HTTPServiceUnavailable(
+                        text=f"{self.name} unavailable (circuit open)",
+                        headers={"Retry-After": str(int(wait) + 1)},
+                    )
+                self.state = State.HALF_OPEN
+                self._trial = False
+            if self.state is State.HALF_OPEN:
+                if self._trial:
+                    self.rejected += 1
+                    raise web.HTTPServiceUnavailable(
+                        text=f"{self.name} unavailable (circuit half open)"
+                    )
+                self._trial = True
+
+    def success(self) -> None:
+        """Record a successful call."""
+        with self._lock:
+            if self.state is not State.CLOSED:
+                _LOG.info("Circuit %s closed", self.name)
+            self.state = State.CLOSED
+            self.failures = 0
+            self._trial = False
+
+    def failure(self) -> None:
+        """Record a failed call."""
+        with self._lock:
+            self.failures += 1
+            self._trial = False
+            if self.state is State.HALF_OPEN or (
+                self.state is State.CLOSED and self.failures >= self.threshold
+            ):
+                _LOG.warning(
+                    "Circuit %s open after %s failures", self.name, self.failures
+                )
+                self.state = State.OPEN
+                self.opened_at = time.monotonic()
+                self.opened += 1
+
+    def release(self) -> None:
+        """Release a half open trial call without a result, e.g. when cancelled."""
+        with self._lock:
+            self._trial = False
+
+    @contextmanager
+    def guard(self) -> Iterator[None]:
+        """Allow the call & record exceptions as failures."""
+        self.allow()
+        try:
+            yield
+        except Exception:
+            self.failure()
+            raise
+        except BaseException:
+            self.release()
+            raise
+        self.success()
+
+    def call[T](
+        self,
+        func: Callable[..., T],
+        /,
+        *args: Any,
+        failed: Callable[[T], bool] | None = None,
+        **kwargs: Any,
+    ) -> T:
+        """Call func, recording exceptions & results where failed(result) as failures."""
+        self.allow()
+        try:
+            res = func(*args, **kwargs)
+        except Exception:
+            self.failure()
+            raise
+        except BaseException:
+            self.release()
+            raise
+        if failed and failed(res):
+            self.failure()
+        else:
+            self.success()
+        return res
+
+    def status(self) -> dict[str, Any]:
+        """Get the breaker status."""
+        return {
+            "state": str(self.state),
+            "failures": self.failures,
+            "opened": self.opened,
+            "rejected": self.rejected,
+        }
+
+
+_BREAKERS: dict[str, CircuitBreaker] = {}
+_BREAKERS_LOCK = threading.Lock()
+
+
+def get_breaker(host: str) -> CircuitBreaker | None:
+    """Get the circuit breaker for a host, or None if disabled.
+
+    Configured by ENV.BREAKER_FAILURES & BREAKER_COOLDOWN.
+    """
+    if not ENV.BREAKER_FAILURES:
+        return None
+    with _BREAKERS_LOCK:
+        if (brk := _BREAKERS.get(host)) is None:
+            brk = _BREAKERS[host] = CircuitBreaker(
+                host, ENV.BREAKER_FAILURES, ENV.BREAKER_COOLDOWN
+            )
+    return brk
+
+
+def breaker_status() -> dict[str, dict[str, Any]]:
+    """Get the status of all circuit breakers."""
+    return {host: brk.status() for host, brk in _BREAKERS.items()}
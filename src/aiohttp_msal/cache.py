@@ -0,0 +1,383 @@
+"""In-memory LRU cache & a conditional request cache for Graph GET responses."""
+
+import base64
+import hashlib
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass, field
+from typing import Any
+
+from aiohttp import ClientResponse
+
+from aiohttp_msal.settings import ENV
+
+_LOG = logging.getLogger(__name__)
+
+
+@dataclass
+class CacheStats:
+    """Cache counters."""
+
+    hits: int = 0
+    misses: int = 0
+    revalidated: int = 0
+    """Entries revalidated with a 304 Not Modified."""
+    evictions: int = 0
+
+    def asdict(self) -> dict[str, Any]:
+        """Get the stats."""
+        return asdict(self)
+
+
+class LRUCache[T]:
+    """A least recently used cache, limited by entries, size & age.
+
+    0 for no limit.
+    """
+
+    def __init__(self, max_entries: int = 0, max_bytes: int = 0, ttl: int = 0) -> None:
+        """Initialize the cache."""
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.bytes = 0
+        self.stats = CacheStats()
+        self._data = OrderedDict[str, tuple[float, int, T]]()
+
+    def __len__(self) -> int:
+        """Entries in the cache."""
+        return len(self._data)
+
+    def get(self, key: str) -> T | None:
+        """Get an entry & mark it as recently used."""
+        if (item := self._data.get(key)) is None:
+            self.stats.misses += 1
+            return None
+        if self.ttl and item[0] + self.ttl < time.monotonic():
+            self.pop(key)
+            self.stats.misses += 1
+            return None
+        self._data.move_to_end(key)
+        self.stats.hits += 1
+        return item[2]
+
+    def set(self, key: str, value: T, size: int = 0) -> None:
+        """Add an entry, evicting the least recently used entries."""
+        if self.max_bytes and size > self.max_bytes:
+            return
+        self.pop(key)
+        self._data[key] = (time.monotonic(), size, value)
+        self.bytes += size
+        while (self.max_entries and len(self._data) > self.max_entries) or (
+            self.max_bytes and self.bytes > self.max_bytes
+        ):
+            _, (_, old, _) = self._data.popitem(last=False)
+            self.bytes -= old
+            self.stats.evictions += 1
+
+    def pop(self, key: str) -> T | None:
+        """Remove an entry."""
+        if (item := self._data.pop(key, None)) is None:
+            return None
+        self.bytes -= item[1]
+        return item[2]
+
+    def clear(self) -> None:
+        """Remove all entries."""
+        self._data.clear()
+        self.bytes = 0
+
+
+def parse_cache_control(value: str | None) -> dict[str, str]:
+    """Parse a Cache-Control header. Directives without a value map to ""."""
+    res: dict[str, str] = {}
+    for part in (value or "").split(","):
+        name, _, val = part.strip().partition("=")
+        if name:
+            res[name.lower()] = val.strip('"')
+    return res
+
+
+@dataclass
+class CachedResponse:
+    """A GET response with its validators (ETag, Last-Modified)."""
+
+    url: str
+    status: int
+    body: bytes = b""
+    headers: dict[str, str] = field(default_factory=dict)
+    stored: float = field(default_factory=time.time)
+
+    @classmethod
+    async def from_response(cls, res: ClientResponse) -> "CachedResponse":
+        """Read a response."""
+        return cls(
+            url=str(res.url),
+            status=res.status,
+            body=await res.read(),
+            headers={
+                k: res.headers[k]
+                for k in ("Content-Type", "ETag", "Last-Modified", "Cache-Control")
+                if k in res.headers
+            },
+        )
+
+    @property
+    def ok(self) -> bool:
+        """If the request succeeded."""
+        return 200 <= self.status < 300
+
+    def json(self) -> Any:
+        """Decode the JSON body."""
+        return ENV.json_loads(self.body)
+
+    def text(self) -> str:
+        """Decode the body."""
+        return self.body.decode()
+
+    @property
+    def max_age(self) -> int | None:
+        """Seconds the response is fresh, None if it must be revalidated."""
+        ccontrol = parse_cache_control(self.headers.get("Cache-Control"))
+        if "no-cache" in ccontrol:
+            return None
+        try:
+            return int(ccontrol["max-age"])
+        except (KeyError, ValueError):
+            return None
+
+    @property
+    def fresh(self) -> bool:
+        """If the response can be used without revalidation."""
+        max_age = self.max_age
+        return max_age is not None and self.stored + max_age > time.time()
+
+    @property
+    def storable(self) -> bool:
+        """If the response can be cached."""
+        if self.status != 200 or "no-store" in parse_cache_control(
+            self.headers.get("Cache-Control")
+        ):
+            return False
+        return bool(
+            self.max_age or "ETag" in self.headers or "Last-Modified" in self.headers
+        )
+
+    def validators(self) -> dict[str, str]:
+        """Conditional request headers to revalidate the response."""
+        res = {}
+        if etag := self.headers.get("ETag"):
+            res["If-None-Match"] = etag
+        if modified := self.headers.get("Last-Modified"):
+            res["If-Modified-Since"] = modified
+        return res
+
+    def dumpb(self) -> bytes:
+        """Serialize for Redis."""
+        data = asdict(self)
+        data["body"] = base64.b64encode(self.body).decode()
+        return ENV.json_dumpb(data)
+
+    @classmethod
+    def loadb(cls, data: bytes) -> "CachedResponse":
+        """Deserialize from Redis."""
+        res = ENV.json_loads(data)
+        res["body"] = base64.b64decode(res["body"])
+        return cls(**res)
+
+
+class TieredCache[T]:
+    """An in-memory LRU cache, optionally backed by Redis (ENV.database)."""
+
+    redis_prefix = ""
+
+    def __init__(self, memory: LRUCache[T], ttl: int, redis: bool = False) -> None:
+        """Initialize the cache."""
+        self.memory = memory
+        self.ttl = ttl
+        self.redis = redis
+
+    def dumpb(self, value: T) -> bytes:
+        """Serialize for Redis."""
+        return ENV.json_dumpb(value)
+
+    def loadb(self, data: bytes) -> T:
+        """Deserialize from Redis."""
+        return ENV.json_loads(data)  # type: ignore[no-any-return]
+
+    def size(self, value: T) -> int:
+        """Size of an entry, for LRUCache.max_bytes."""
+        return 0
+
+    async def get(self, key: str) -> T | None:
+        """Get an entry."""
+        if (res := self.memory.get(key)) is not None:
+            return res
+        if not (self.redis and ENV.database):
+            return None
+        if not (data := await ENV.database.get(self.redis_prefix + key)):
+            return None
+        try:
+            res = self.loadb(data)
+        except (ValueError, TypeError, KeyError) as err:
+            _LOG.warning("Invalid cache entry %s%s: %s", self.redis_prefix, key, err)
+            return None
+        self.memory.set(key, res, self.size(res))
+        return res
+
+    async def set(self, key: str, value: T) -> None:
+        """Store an entry."""
+        self.memory.set(key, value, self.size(value))
+        if self.redis and ENV.database:
+            await ENV.database.set(
+                self.redis_prefix + key, self.dumpb(value), ex=self.ttl or None
+            )
+
+
+class ResponseCache(TieredCache[CachedResponse]):
+    """Cache GET responses per user, in memory & optionally in Redis.
+
+    Entries are keyed by the user identity & the URL, so cached responses are
+    never shared between users.
+    """
+
+    redis_prefix = "msal_response_cache_"
+
+    def __init__(self, max_entries: int, ttl: int, redis: bool = False) -> None:
+        """Initialize the cache."""
+        super().__init__(LRUCache(max_entries, ttl=ttl), ttl, redis)
+
+    def dumpb(self, value: CachedResponse) -> bytes:
+        """Serialize for Redis."""
+        return value.dumpb()
+
+    def loadb(self, data: bytes) -> CachedResponse:
+        """Deserialize from Redis."""
+        return CachedResponse.loadb(data)
+
+    @staticmethod
+    def key(identity: str, url: str) -> str:
+        """Cache key for a user & URL."""
+        return hashlib.sha256(f"{identity}\n{url}".encode()).hexdigest()
+
+    async def revalidated(
+        self, key: str, entry: CachedResponse, res: ClientResponse
+    ) -> CachedResponse:
+        """Refresh an entry after a 304 Not Modified response."""
+        self.memory.stats.revalidated += 1
+        entry.stored = time.time()
+        if ccontrol := res.headers.get("Cache-Control"):
+            entry.headers["Cache-Control"] = ccontrol
+        await self.set(key, entry)
+        return entry
+
+
+_RESPONSE_CACHE: ResponseCache | None = None
+
+
+def get_response_cache() -> ResponseCache | None:
+    """Get the response cache, or None if disabled.
+
+    Configured by ENV.RESPONSE_CACHE, RESPONSE_CACHE_TTL & RESPONSE_CACHE_REDIS.
+    """
+    global _RESPONSE_CACHE  # noqa: PLW0603
+    if not ENV.RESPONSE_CACHE:
+        return None
+    if _RESPONSE_CACHE is None:
+        _RESPONSE_CACHE = ResponseCache(
+            ENV.RESPONSE_CACHE, ENV.RESPONSE_CACHE_TTL, ENV.RESPONSE_CACHE_REDIS
+        )
+    return _RESPONSE_CACHE
+
+
+@dataclass
+class Photo:
+    """A cached user photo."""
+
+    body: bytes
+    content_type: str = "image/jpeg"
+    etag: str = ""
+
+    def __post_init__(self) -> None:
+        """Use a hash of the photo as ETag, if Graph did not return one."""
+        if not self.etag:
+            self.etag = f'"{hashlib.sha256(self.body).hexdigest()[:32]}"'
+
+    def dumpb(self) -> bytes:
+        """Serialize for Redis."""
+        return b"\n".join((self.content_type.encode(), self.etag.encode(), self.body))
+
+    @classmethod
+    def loadb(cls, data: bytes) -> "Photo":
+        """Deserialize from Redis."""
+        content_type, etag, body = data.split(b"\n", 2)
+        return cls(body, content_type.decode(), etag.decode())
+
+
+class PhotoCache(TieredCache[Photo]):
+    """Cache user photos, in memory (limited by size) & optionally in Redis."""
+
+    redis_prefix = "msal_photo_"
+
+    def __init__(self, max_bytes: int, ttl: int, redis: bool = False) -> None:
+        """Initialize the cache."""
+        super().__init__(LRUCache(max_bytes=max_bytes, ttl=ttl), ttl, redis)
+
+    def dumpb(self, value: Photo) -> bytes:
+        """Serialize for Redis."""
+        return value.dumpb()
+
+    def loadb(self, data: bytes) -> Photo:
+        """Deserialize from Redis."""
+        return Photo.loadb(data)
+
+    def size(self, value: Photo) -> int:
+        """Size of the photo."""
+        return len(value.body)
+
+
+_PHOTO_CACHE: PhotoCache | None = None
+
+
+def get_photo_cache() -> PhotoCache | None:
+    """Get the photo cache, or None if disabled.
+
+    Configured by ENV.PHOTO_CACHE_BYTES, PHOTO_CACHE_TTL & PHOTO_CACHE_REDIS.
+    """
+    global _PHOTO_CACHE  # noqa: PLW0603
+    if not ENV.PHOTO_CACHE_BYTES:
+        return None
+    if _PHOTO_CACHE is None:
+        _PHOTO_CACHE = PhotoCache(
+            ENV.PHOTO_CACHE_BYTES, ENV.PHOTO_CACHE_TTL, ENV.PHOTO_CACHE_REDIS
+        )
+    return _PHOTO_CACHE
+
+
+class ProfileCache(TieredCache[dict[str, str]]):
+    """Cache profile & manager info (session keys) by the user's object id."""
+
+    redis_prefix = "msal_profile_"
+
+    def __init__(self, max_entries: int, ttl: int, redis: bool = False) -> None:
+        """Initialize the cache."""
+        super().__init__(LRUCache(max_entries, ttl=ttl), ttl, redis)
+
+
+_PROFILE_CACHE: ProfileCache | None = None
+
+
+def get_profile_cache() -> ProfileCache | None:
+    """Get the profile cache, or None if disabled.
+
+    Configured by ENV.PROFILE_CACHE, PROFILE_CACHE_TTL & PROFILE_CACHE_REDIS.
+    """
+    global _PROFILE_CACHE  # noqa: PLW0603
+    if not ENV.PROFILE_CACHE:
+        return None
+    if _PROFILE_CACHE is None:
+        _PROFILE_CACHE = ProfileCache(
+            ENV.PROFILE_CACHE, ENV.PROFILE_CACHE_TTL, ENV.PROFILE_CACHE_REDIS
+        )
+    return _PROFILE_CACHE
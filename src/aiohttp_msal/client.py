@@ -0,0 +1,53 @@
+"""Shared aiohttp ClientSession for requests with the MSAL tokens."""
+
+import logging
+from typing import Any
+
+from aiohttp import BaseConnector, ClientSession, ClientTimeout, TCPConnector
+
+from aiohttp_msal.settings import ENV
+
+_LOG = logging.getLogger(__name__)
+
+
+def create_client_session() -> ClientSession:
+    """Create a ClientSession configured by the ENV.HTTP_* settings."""
+    connector = TCPConnector(
+        limit=ENV.HTTP_LIMIT,
+        limit_per_host=ENV.HTTP_LIMIT_PER_HOST,
+        keepalive_timeout=ENV.HTTP_KEEPALIVE,
+        ttl_dns_cache=ENV.HTTP_DNS_TTL or None,
+        use_dns_cache=ENV.HTTP_DNS_TTL > 0,
+    )
+    timeout = ClientTimeout(
+        total=ENV.HTTP_TIMEOUT or None, connect=ENV.HTTP_CONNECT_TIMEOUT or None
+    )
+    return ClientSession(connector=connector, timeout=timeout, trust_env=True)
+
+
+async def warm_client_session(cses: ClientSession) -> None:
+    """Resolve DNS & open connections to the ENV.HTTP_WARMUP URLs."""
+    for url in filter(None, (u.strip() for u in ENV.HTTP_WARMUP.split(","))):
+        try:
+            async with cses.head(url) as resp:
+                _LOG.debug("Warm up %s: %s", url, resp.status)
+        except Exception as err:
+            _LOG.warning("Warm up %s failed: %s", url, err)
+
+
+def client_session_stats(cses: ClientSession | None) -> dict[str, Any]:
+    """Get the connection pool usage."""
+    conn: BaseConnector | None = cses.connector if cses else None
+    if conn is None or conn.closed:
+        return {}
+    return {
+        "limit": conn.limit,
+        "limit_per_host": conn.limit_per_host,
+        "acquired": len(conn._acquired),
+        "idle": sum(len(c) for c in conn._conns.values()),
+        "waiting": sum(len(w) for w in conn._waiters.values()),
+        "hosts": {
+            f"{key.host}:{key.port}": len(acq)
+            for key, acq in conn._acquired_per_host.items()
+        },
+    }
@@ -0,0 +1,143 @@
+"""Session codec for Redis.
+
+Sessions larger than ENV.SESSION_COMPRESS_MIN are compressed with
+ENV.SESSION_COMPRESSION and stored with a versioned binary header:
+MAGIC, version & format byte. Plain JSON sessions remain readable, so existing
+sessions are migrated when they are saved.
+"""
+
+import time
+import uuid
+import zlib
+from collections.abc import Callable
+from typing import Any
+
+from aiohttp import web
+from aiohttp_session import AbstractStorage, Session
+from redis.asyncio import Redis, RedisCluster
+
+from aiohttp_msal.settings import ENV
+
+try:
+    from compression import zstd  # type: ignore[import-not-found]
+except ImportError:  # Python < 3.14
+    zstd = None  # type: ignore[assignment]
+
+MAGIC = b"\xffM"
+"""Not valid UTF-8, so never the start of a JSON session."""
+VERSION = 1
+
+FORMATS: dict[str, tuple[int, Callable[[bytes], bytes], Callable[[bytes], bytes]]] = {
+    "zlib": (1, zlib.compress, zlib.decompress),
+}
+"""Compression name: (format byte, compress, decompress)."""
+if zstd is not None:
+    FORMATS["zstd"] = (2, zstd.compress, zstd.decompress)
+_DECOMPRESS = {fmt: dec for fmt, _, dec in FORMATS.values()}
+
+
+def session_ttl(created: int, max_age: int) -> int:
+    """Seconds until a session expires, max_age after it was created. At least 1."""
+    return max(1, int(created + max_age - time.time()))
+
+
+def encode_session(data: Any) -> bytes:
+    """Encode a session."""
+    raw = ENV.json_dumpb(data)
+    if not ENV.SESSION_COMPRESSION or len(raw) < ENV.SESSION_COMPRESS_MIN:
+        return raw
+    try:
+        fmt, compress, _ = FORMATS[ENV.SESSION_COMPRESSION]
+    except KeyError:
+        raise ValueError(f"Unknown compression {ENV.SESSION_COMPRESSION}") from None
+    return MAGIC + bytes((VERSION, fmt)) + compress(raw)
+
+
+def decode_session(data: str | bytes | bytearray) -> Any:
+    """Decode a session, compressed or plain JSON."""
+    if isinstance(data, str) or data[:2] != MAGIC:
+        return ENV.json_loads(data)
+    version, fmt = data[2:4]
+    if version != VERSION or fmt not in _DECOMPRESS:
+        raise ValueError(f"Unsupported session format {version}.{fmt}")
+    try:
+        return ENV.json_loads(_DECOMPRESS[fmt](bytes(data[4:])))
+    except Exception as err:
+        raise ValueError(f"Invalid session: {err}") from err
+
+
+class RedisStorage(AbstractStorage):
+    """Redis storage passing bytes to the decoder, required for binary sessions.
+
+    Sessions are stored with a TTL from their creation, not from the last save.
+    Unlike aiohttp_session's RedisStorage, a RedisCluster is also accepted.
+    """
+
+    def __init__(  # noqa: PLR0913
+        self,
+        redis_pool: Redis,
+        *,
+        cookie_name: str = "AIOHTTP_SESSION",
+        domain: str | None = None,
+        max_age: int | None = None,
+        path: str = "/",
+        secure: bool | None = None,
+        httponly: bool = True,
+        samesite: str | None = None,
+        key_factory: Callable[[], str] = lambda: uuid.uuid4().hex,
+        encoder: Callable[[object], str | bytes] = encode_session,
+        decoder: Callable[[str | bytes], Any] = decode_session,
+    ) -> None:
+        """Initialize."""
+        super().__init__(
+            cookie_name=cookie_name,
+            domain=domain,
+            max_age=max_age,
+            path=path,
+            secure=secure,
+            httponly=httponly,
+            samesite=samesite,
+            encoder=encoder,  # type: ignore[arg-type]
+            decoder=decoder,  # type: ignore[arg-type]
+        )
+        if not isinstance(redis_pool, Redis | RedisCluster):
+            raise TypeError(f"Expected a Redis or RedisCluster, got {type(redis_pool)}")
+        self._key_factory = key_factory
+        self._redis = redis_pool
+
+    async def load_session(self, request: web.Request) -> Session:
+        """Load the session."""
+        cookie = self.load_cookie(request)
+        if cookie is None:
+            return Session(None, data=None, new=True, max_age=self.max_age)
+        key = str(cookie)
+        data_bytes = await self._redis.get(self.cookie_name + "_" + key)
+        if data_bytes is None:
+            return Session(None, data=None, new=True, max_age=self.max_age)
+        try:
+            data = self._decoder(data_bytes)
+        except ValueError:
+            data = None
+        return Session(key, data=data, new=False, max_age=self.max_age)
+
+    async def save_session(
+        self, request: web.Request, response: web.StreamResponse, session: Session
+    ) -> None:
+        """Save the session."""
+        key = session.identity
+        if key is None:
+            key = self._key_factory()
+            self.save_cookie(response, key, max_age=session.max_age)
+        elif session.empty:
+            self.save_cookie(response, "", max_age=session.max_age)
+        else:
+            key = str(key)
+            self.save_cookie(response, key, max_age=session.max_age)
+
+        await self._redis.set(
+            self.cookie_name + "_" + key,
+            self._encoder(self._get_session_data(session)),
+            ex=session_ttl(session.created, session.max_age)
+            if session.max_age
+            else None,
+        )
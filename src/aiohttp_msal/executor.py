@@ -0,0 +1,125 @@
+"""Dedicated executor for blocking MSAL calls."""
+
+import asyncio
+import contextvars
+import logging
+import threading
+import time
+from collections.abc import Callable
+from concurrent.futures import CancelledError, ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from functools import partial
+from typing import Any
+
+from aiohttp import web
+
+from aiohttp_msal.settings import ENV
+
+_LOG = logging.getLogger(__name__)
+
+WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, float("inf"))
+"""Upper bounds (seconds) of the wait time histogram buckets."""
+
+
+@dataclass
+class ExecutorStats:
+    """Executor counters."""
+
+    queued: int = 0
+    """Calls waiting for a thread."""
+    running: int = 0
+    completed: int = 0
+    rejected: int = 0
+    wait_time: dict[float, int] = field(
+        default_factory=lambda: dict.fromkeys(WAIT_BUCKETS, 0)
+    )
+    """Histogram of the time calls waited for a thread."""
+
+    def asdict(self) -> dict[str, Any]:
+        """Get the stats."""
+        return asdict(self)
+
+
+class MSALExecutor:
+    """A bounded thread pool for blocking MSAL calls.
+
+    Calls are rejected with HTTP 503 when max_queue calls are already waiting.
+    """
+
+    def __init__(self, max_workers: int, max_queue: int = 0) -> None:
+        """Initialize the executor."""
+        self.max_queue = max_queue
+        self.pool = ThreadPoolExecutor(max_workers, thread_name_prefix="msal")
+        self.stats = ExecutorStats()
+        self._lock = threading.Lock()
+
+    async def run[T](self, func: Callable[..., T], /, *args: Any, **kwargs: Any) -> T:
+        """Run func in the executor, similar to asyncio.to_thread."""
+        with self._lock:
+            if self.max_queue and self.stats.queued >= self.max_queue:
+                self.stats.rejected += 1
+                raise web.HTTPServiceUnavailable(text="Too many MSAL requests queued")
+            self.stats.queued += 1
+        submitted = time.perf_counter()
+        started = False
+
+        def call() -> T:
+            nonlocal started
+            wait = time.perf_counter() - submitted
+            with self._lock:
+                if started:  # the caller was cancelled while queued
+                    raise CancelledError
+                started = True
+                self.stats.queued -= 1
+                self.stats.running += 1
+                bucket = next(b for b in WAIT_BUCKETS if wait <= b)
+                self.stats.wait_time[bucket] += 1
+            try:
+                return func(*args, **kwargs)
+            finally:
+                with self._lock:
+                    self.stats.running -= 1
+                    self.stats.completed += 1
+
+        ctx = contextvars.copy_context()
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(self.pool, partial(ctx.run, call))
+        finally:
+            with self._lock:
+                if not started:
+                    started = True
+                    self.stats.queued -= 1
+
+    def shutdown(self) -> None:
+        """Shutdown the thread pool."""
+        self.pool.shutdown(wait=False, cancel_futures=True)
+
+
+_EXECUTOR: MSALExecutor | None = None
+
+
+def get_executor() -> MSALExecutor:
+    """Get the MSAL executor, configured by ENV.EXECUTOR_WORKERS & EXECUTOR_QUEUE."""
+    global _EXECUTOR  # noqa: PLW0603
+    if _EXECUTOR is None:
+        _LOG.debug(
+            "MSAL executor: %s workers, max queue %s",
+            ENV.EXECUTOR_WORKERS,
+            ENV.EXECUTOR_QUEUE,
+        )
+        _EXECUTOR = MSALExecutor(ENV.EXECUTOR_WORKERS, ENV.EXECUTOR_QUEUE)
+    return _EXECUTOR
+
+
+async def run_in_executor[T](func: Callable[..., T], /, *args: Any, **kwargs: Any) -> T:
+    """Run a blocking function in the MSAL executor."""
+    return await get_executor().run(func, *args, **kwargs)
+
+
+def shutdown_executor() -> None:
+    """Shutdown the MSAL executor. A new one is created on the next call."""
+    global _EXECUTOR  # noqa: PLW0603
+    if _EXECUTOR is not None:
+        _EXECUTOR.shutdown()
+        _EXECUTOR = None
@@ -0,0 +1,183 @@
+"""Microsoft Graph helpers."""
+
+import asyncio
+from collections.abc import AsyncGenerator, Sequence
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any
+
+from aiohttp import web
+
+if TYPE_CHECKING:
+    from aiohttp_msal.msal_async import AsyncMSAL
+
+GRAPH_URL = "https://graph.microsoft.com/v1.0"
+BATCH_LIMIT = 20
+"""Max requests in a single Graph $batch request."""
+
+
+@dataclass
+class BatchResponse:
+    """Response of a single request in a $batch."""
+
+    id: str
+    status: int
+    headers: dict[str, str] = field(default_factory=dict)
+    body: Any = None
+
+    @property
+    def ok(self) -> bool:
+        """If the request succeeded."""
+        return 200 <= self.status < 300
+
+
+@dataclass
+class GraphBatch:
+    """Collect Graph requests & send them as JSON $batch requests.
+
+    Requests are split in batches of BATCH_LIMIT, keeping requests that depend on
+    each other (dependsOn) in the same batch.
+    """
+
+    aiomsal: "AsyncMSAL"
+    base_url: str = GRAPH_URL
+    requests: list[dict[str, Any]] = field(default_factory=list)
+
+    def add(  # noqa: PLR0913
+        self,
+        url: str,
+        method: str = "GET",
+        *,
+        id: str = "",  # noqa: A002
+        body: Any = None,
+        headers: dict[str, str] | None = None,
+        depends_on: list[str] | None = None,
+    ) -> str:
+        """Add a request, relative to base_url. Returns the request id."""
+        rid = id or str(len(self.requests) + 1)
+        if any(r["id"] == rid for r in self.requests):
+            raise ValueError(f"Duplicate request id {rid}")
+        req: dict[str, Any] = {"id": rid, "method": method.upper(), "url": url}
+        if body is not None:
+            req["body"] = body
+            headers = {"Content-Type": "application/json", **(headers or {})}
+        if headers:
+            req["headers"] = headers
+        if depends_on:
+            if missing := set(depends_on) - {r["id"] for r in self.requests}:
+                raise ValueError(f"Unknown dependsOn {missing} for request {rid}")
+            req["dependsOn"] = depends_on
+        self.requests.append(req)
+        return rid
+
+    def get(self, url: str, *, id: str = "", **kwargs: Any) -> str:  # noqa: A002
+        """Add a GET request. Returns the request id."""
+        return self.add(url, "GET", id=id, **kwargs)
+
+    def batches(self) -> list[list[dict[str, Any]]]:
+        """Split the requests, keeping dependent requests together."""
+        root: dict[str, str] = {}
+
+        def find(rid: str) -> str:
+            while root[rid] != rid:
+                rid = root[rid]
+            return rid
+
+        for req in self.requests:
+            root[req["id"]] = req["id"]
+            for dep in req.get("dependsOn", []):
+                root[find(dep)] = req["id"]
+
+        groups: dict[str, list[dict[str, Any]]] = {}
+        for req in self.requests:
+            groups.setdefault(find(req["id"]), []).append(req)
+
+        res: list[list[dict[str, Any]]] = []
+        for grp in groups.values():
+            if len(grp) > BATCH_LIMIT:
+                raise ValueError(
+                    f"More than {BATCH_LIMIT} dependent requests: {grp[0]['id']}"
+                )
+            for bat in res:
+                if len(bat) + len(grp) <= BATCH_LIMIT:
+                    bat.extend(grp)
+                    break
+            else:
+                res.append(list(grp))
+        return res
+
+    async def _send(self, requests: list[dict[str, Any]]) -> list[BatchResponse]:
+        async with self.aiomsal.post(
+            f"{self.base_url}/$batch",
+            data={"requests": requests},  # type: ignore[arg-type]
+        ) as res:
+            if not res.ok:
+                raise web.HTTPBadGateway(
+                    text=f"Graph $batch failed: {res.status} {await res.text()}"
+                )
+            body = await res.json()
+        return [
+            BatchResponse(
+                id=str(item["id"]),
+                status=int(item["status"]),
+                headers=item.get("headers") or {},
+                body=item.get("body"),
+            )
+            for item in body["responses"]
+        ]
+
+    async def send(self) -> dict[str, BatchResponse]:
+        """Send all requests. Returns the responses by request id."""
+        batches = await asyncio.gather(*(self._send(b) for b in self.batches()))
+        self.requests = []
+        return {r.id: r for bat in batches for r in bat}
+
+
+async def iter_collection(
+    aiomsal: "AsyncMSAL",
+    url: str,
+    *,
+    top: int = 0,
+    select: Sequence[str] = (),
+    max_items: int = 0,
+) -> AsyncGenerator[dict[str, Any]]:
+    """Iterate over the items of a Graph collection, following @odata.nextLink.
+
+    The next page is fetched while the current page is consumed, so at most two
+    pages are held in memory.
+    """
+    params: dict[str, str] = {}
+    if top:
+        params["$top"] = str(top)
+    if select:
+        params["$select"] = ",".join(select)
+
+    async def fetch(page_url: str, params: dict[str, str]) -> dict[str, Any]:
+        async with aiomsal.get(page_url, params=params) as res:
+            if not res.ok:
+                raise web.HTTPBadGateway(
+                    text=f"Graph {page_url} failed: {res.status} {await res.text()}"
+                )
+            return await res.json()
+
+    task: asyncio.Task[dict[str, Any]] | None = asyncio.create_task(
+        fetch(url if url.startswith("https://") else GRAPH_URL + url, params)
+    )
+    count = 0
+    try:
+        while task:
+            page = await task
+            values = page.get("value", [])
+            task = None
+            if (next_url := page.get("@odata.nextLink")) and not (
+                max_items and count + len(values) >= max_items
+            ):
+                # nextLink includes the query parameters
+                task = asyncio.create_task(fetch(next_url, {}))
+            for item in values:
+                yield item
+                count += 1
+                if max_items and count >= max_items:
+                    return
+    finally:
+        if task:
+            task.cancel()
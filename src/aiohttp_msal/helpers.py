@@ -5,17 +5,46 @@ from typing import TYPE_CHECKING, Any
 
 from aiohttp import web
 
+from aiohttp_msal.cache import get_profile_cache
 from aiohttp_msal.settings import ENV
-from aiohttp_msal.utils import retry
 
 if TYPE_CHECKING:
     from aiohttp_msal.msal_async import AsyncMSAL
 
+PROFILE_SELECT = "$select=mail,displayName"
+"""Only request the profile fields stored in the session."""
+USER_KEYS = ("mail", "name")
+MANAGER_KEYS = ("m_mail", "m_name")
+
+
+async def load_profile(aiomsal: "AsyncMSAL", keys: Sequence[str]) -> bool:
+    """Load session keys from the profile cache. Returns True if all were cached."""
+    if not (cache := get_profile_cache()) or not aiomsal.oid:
+        return False
+    profile = await cache.get(aiomsal.oid)
+    if not profile or not all(k in profile for k in keys):
+        return False
+    for key in keys:
+        aiomsal.session[key] = profile[key]
+    return True
+
+
+async def save_profile(aiomsal: "AsyncMSAL", keys: Sequence[str]) -> None:
+    """Save session keys in the profile cache."""
+    if not (cache := get_profile_cache()) or not aiomsal.oid:
+        return
+    profile = dict(await cache.get(aiomsal.oid) or {})
+    profile.update({k: aiomsal.session.get(k, "") for k in keys})
+    await cache.set(aiomsal.oid, profile)
+
 
-@retry
 async def get_user_info(aiomsal: "AsyncMSAL") -> None:
     """Load user info from MS graph API. Requires User.Read permissions."""
-    async with aiomsal.get("https://graph.microsoft.com/v1.0/me") as res:
+    if await load_profile(aiomsal, USER_KEYS):
+        return
+    async with aiomsal.get(
+        f"https://graph.microsoft.com/v1.0/me?{PROFILE_SELECT}"
+    ) as res:
         body = await res.json()
         try:
             aiomsal.mail = body["mail"]
@@ -24,12 +53,16 @@ async def get_user_info(aiomsal: "AsyncMSAL") -> None:
             raise KeyError(
                 f"Unexpected return from Graph endpoint: {body}: {err}"
             ) from err
+    await save_profile(aiomsal, USER_KEYS)
 
 
-@retry
 async def get_manager_info(aiomsal: "AsyncMSAL") -> None:
     """Load manager info from MS graph API. Requires User.Read.All permissions."""
-    async with aiomsal.get("https://graph.microsoft.com/v1.0/me/manager") as res:
+    if await load_profile(aiomsal, MANAGER_KEYS):
+        return
+    async with aiomsal.get(
+        f"https://graph.microsoft.com/v1.0/me/manager?{PROFILE_SELECT}"
+    ) as res:
         body = await res.json()
         try:
             aiomsal.manager_mail = body["mail"]
@@ -38,6 +71,32 @@ async def get_manager_info(aiomsal: "AsyncMSAL") -> None:
             raise KeyError(
                 f"Unexpected return from Graph endpoint: {body}: {err}"
             ) from err
+    await save_profile(aiomsal, MANAGER_KEYS)
+
+
+async def get_user_and_manager_info(aiomsal: "AsyncMSAL") -> None:
+    """Load user & manager info with a single MS graph $batch request."""
+    if await load_profile(aiomsal, USER_KEYS + MANAGER_KEYS):
+        return
+    batch = aiomsal.batch()
+    batch.get(f"/me?{PROFILE_SELECT}", id="me")
+    batch.get(f"/me/manager?{PROFILE_SELECT}", id="manager")
+    res = await batch.send()
+    for rid, (mail, name) in {
+        "me": ("mail", "name"),
+        "manager": ("manager_mail", "manager_name"),
+    }.items():
+        body = res[rid].body
+        try:
+            if not res[rid].ok:
+                raise KeyError(res[rid].status)
+            setattr(aiomsal, mail, body["mail"])
+            setattr(aiomsal, name, body["displayName"])
+        except KeyError as err:
+            raise KeyError(
+                f"Unexpected return from Graph endpoint /{rid}: {body}: {err}"
+            ) from err
+    await save_profile(aiomsal, USER_KEYS + MANAGER_KEYS)
 
 
 def html_table(items: Mapping[Any, Any]) -> str:
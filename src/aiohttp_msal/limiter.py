@@ -0,0 +1,130 @@
+"""Client side rate limiting of outgoing requests, per host."""
+
+import asyncio
+import logging
+import time
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from dataclasses import asdict, dataclass, field
+from typing import Any
+
+from aiohttp import web
+
+from aiohttp_msal.executor import WAIT_BUCKETS
+from aiohttp_msal.settings import ENV
+
+_LOG = logging.getLogger(__name__)
+
+
+@dataclass
+class LimiterStats:
+    """Limiter counters."""
+
+    queued: int = 0
+    """Requests waiting for a token or a slot."""
+    in_flight: int = 0
+    completed: int = 0
+    rejected: int = 0
+    wait_time: dict[float, int] = field(
+        default_factory=lambda: dict.fromkeys(WAIT_BUCKETS, 0)
+    )
+    """Histogram of the time requests waited."""
+
+    def asdict(self) -> dict[str, Any]:
+        """Get the stats."""
+        return asdict(self)
+
+
+class HostLimiter:
+    """Limit the requests in flight (semaphore) & the request rate (token bucket).
+
+    Requests are rejected with HTTP 503 when they would wait longer than deadline
+    seconds.
+    """
+
+    def __init__(
+        self, concurrency: int = 0, rate: int = 0, burst: int = 0, deadline: float = 0
+    ) -> None:
+        """Initialize the limiter. 0 for no limit."""
+        self.semaphore = asyncio.Semaphore(concurrency) if concurrency else None
+        self.rate = rate
+        self.burst = burst or rate
+        self.deadline = deadline
+        self.tokens = float(self.burst)
+        self.updated = time.monotonic()
+        self.stats = LimiterStats()
+
+    def _reject(self, reason: str) -> web.HTTPServiceUnavailable:
+        self.stats.rejected += 1
+        _LOG.warning("Request rejected: %s", reason)
+        return web.HTTPServiceUnavailable(text=f"Too many requests queued: {reason}")
+
+    def reserve(self) -> float:
+        """Take a token. Returns the seconds to wait before it is available."""
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        wait = max(0.0, (1 - self.tokens) / self.rate)
+        if self.deadline and wait > self.deadline:
+            raise self._reject(f"rate wait {wait:.1f}s")
+        self.tokens -= 1
+        return wait
+
+    @asynccontextmanager
+    async def acquire(self) -> AsyncIterator[None]:
+        """Wait for a token & a slot."""
+        start = time.perf_counter()
+        self.stats.queued += 1
+        try:
+            if self.rate and (wait := self.reserve()):
+                await asyncio.sleep(wait)
+            if self.semaphore:
+                remaining = (
+                    self.deadline - (time.perf_counter() - start)
+                    if self.deadline
+                    else None
+                )
+                try:
+                    async with asyncio.timeout(remaining):
+                        await self.semaphore.acquire()
+                except TimeoutError:
+                    raise self._reject("concurrency") from None
+        finally:
+            self.stats.queued -= 1
+        wait = time.perf_counter() - start
+        self.stats.wait_time[next(b for b in WAIT_BUCKETS if wait <= b)] += 1
+        self.stats.in_flight += 1
+        try:
+            yield
+        finally:
+            self.stats.in_flight -= 1
+            self.stats.completed += 1
+            if self.semaphore:
+                self.semaphore.release()
+
+
+_LIMITERS: dict[str, HostLimiter] = {}
+
+
+def get_limiter(host: str, app_id: str = "") -> HostLimiter | None:
+    """Get the limiter for a host, or None if no limits are configured.
+
+    Configured by ENV.HTTP_HOST_CONCURRENCY, HTTP_HOST_RATE, HTTP_HOST_BURST &
+    HTTP_QUEUE_DEADLINE. Limiters are per host & app_id with ENV.HTTP_LIMIT_BY_APP.
+    """
+    if not (ENV.HTTP_HOST_CONCURRENCY or ENV.HTTP_HOST_RATE):
+        return None
+    key = f"{host}/{app_id}" if ENV.HTTP_LIMIT_BY_APP and app_id else host
+    if (lim := _LIMITERS.get(key)) is None:
+        lim = _LIMITERS[key] = HostLimiter(
+            ENV.HTTP_HOST_CONCURRENCY,
+            ENV.HTTP_HOST_RATE,
+            ENV.HTTP_HOST_BURST,
+            ENV.HTTP_QUEUE_DEADLINE,
+        )
+    return lim
+
+
+def limiter_stats() -> dict[str, dict[str, Any]]:
+    """Get the stats of all limiters."""
+    return {key: lim.stats.asdict() for key, lim in _LIMITERS.items()}
@@ -7,10 +7,15 @@ Once you have the OAuth tokens store in the session, you are free to make reques
 
 import asyncio
 import logging
-from collections.abc import Callable
-from dataclasses import dataclass
-from functools import cached_property, partialmethod
-from typing import Any, ClassVar, Literal, Self, Unpack, cast
+import threading
+import time
+from collections.abc import AsyncGenerator, Callable, Iterator, Mapping, Sequence
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from functools import cached_property, partialmethod, wraps
+from typing import TYPE_CHECKING, Any, ClassVar, Literal, Self, Unpack, cast
+from uuid import uuid4
 
 from aiohttp import web
 from aiohttp.client import (
@@ -22,10 +27,24 @@ from aiohttp.client import (
 from aiohttp.typedefs import StrOrURL
 from aiohttp_session import Session, get_session, new_session
 from msal import ConfidentialClientApplication, SerializableTokenCache
+from yarl import URL
 
 from aiohttp_msal import helpers
+from aiohttp_msal.breaker import get_breaker
+from aiohttp_msal.cache import CachedResponse, get_response_cache
+from aiohttp_msal.client import create_client_session
+from aiohttp_msal.codec import session_ttl
+from aiohttp_msal.executor import run_in_executor
+from aiohttp_msal.graph import GraphBatch, iter_collection
+from aiohttp_msal.limiter import get_limiter
+from aiohttp_msal.session_index import index_session
 from aiohttp_msal.settings import ENV
-from aiohttp_msal.utils import dict_property
+from aiohttp_msal.utils import RetryPolicy, dict_property, retry
+
+if TYPE_CHECKING:
+    from redis.asyncio import Redis
+
+    from aiohttp_msal.refresh import TokenRefresher
 
 _LOG = logging.getLogger(__name__)
 
@@ -36,6 +55,110 @@ HTTP_PUT = "put"
 HTTP_PATCH = "patch"
 HTTP_DELETE = "delete"
 HTTP_ALLOWED = [HTTP_GET, HTTP_POST, HTTP_PUT, HTTP_PATCH, HTTP_DELETE]
+TOKEN_EXPIRY_MARGIN = 5 * 60
+"""Seconds before expiry an access token is considered expired, same as MSAL."""
+
+TOKEN_SERVER_ERRORS = ("server_error", "temporarily_unavailable")
+"""OAuth errors of an unavailable token endpoint, failures for the circuit breaker."""
+
+_TOKEN_CACHE = ContextVar[SerializableTokenCache | None]("token_cache", default=None)
+_APPS: dict[tuple[tuple[str, str], ...], "SharedClientApplication"] = {}
+_APPS_LOCK = threading.Lock()
+_REFRESHES: dict[
+    tuple[str, ...],
+    asyncio.Task[tuple[dict[str, Any] | None, str, Session | dict[str, Any]]],
+] = {}
+
+
+class SharedClientApplication(ConfidentialClientApplication):
+    """A ConfidentialClientApplication shared by all sessions.
+
+    MSAL reads self.token_cache on every call. Here it resolves to the cache bound
+    with bind_token_cache() in the current context, so one application can serve
+    many sessions concurrently (also from executor threads).
+    """
+
+    @property
+    def token_cache(self) -> SerializableTokenCache:
+        """Get the token cache bound to the current context."""
+        if (cache := _TOKEN_CACHE.get()) is None:
+            raise RuntimeError("No token cache bound. Use bind_token_cache()")
+        return cache
+
+    @token_cache.setter
+    def token_cache(self, _: Any) -> None:
+        """Ignore the cache assigned by ClientApplication.__init__."""
+
+
+@contextmanager
+def bind_token_cache(cache: SerializableTokenCache) -> Iterator[None]:
+    """Bind a token cache to SharedClientApplication calls in this context."""
+    token = _TOKEN_CACHE.set(cache)
+    try:
+        yield
+    finally:
+        _TOKEN_CACHE.reset(token)
+
+
+class BoundClientApplication:
+    """A SharedClientApplication bound to the token cache of a session.
+
+    Attributes & method calls are forwarded inside bind_token_cache(), so the
+    application can be used as if it had its own token cache.
+    """
+
+    def __init__(
+        self,
+        app: SharedClientApplication,
+        token_cache: Callable[[], SerializableTokenCache],
+    ) -> None:
+        """Initialize."""
+        self.shared_app = app
+        self._token_cache = token_cache
+
+    def __getattr__(self, name: str) -> Any:
+        """Get an attribute of the shared app, binding methods to the token cache."""
+        cache = self._token_cache()
+        with bind_token_cache(cache):
+            value = getattr(self.shared_app, name)
+        if not callable(value):
+            return value
+
+        @wraps(value)
+        def bound(*args: Any, **kwargs: Any) -> Any:
+            with bind_token_cache(cache):
+                return value(*args, **kwargs)
+
+        return bound
+
+
+def get_app(app_kwargs: dict[str, Any] | None = None) -> SharedClientApplication:
+    """Get the shared ConfidentialClientApplication for the settings & app_kwargs.
+
+    Construction is expensive (authority parsing, tenant discovery, HTTP client)
+    so there is only one application per client_id, authority & app_kwargs.
+    """
+    kwargs = {
+        "client_id": ENV.SP_APP_ID,
+        "client_credential": ENV.SP_APP_PW,
+        "authority": ENV.SP_AUTHORITY,
+        "validate_authority": False,
+    }
+    if app_kwargs:
+        kwargs.update(app_kwargs)
+    key = tuple(sorted((k, repr(v)) for k, v in kwargs.items()))
+    if app := _APPS.get(key):
+        return app
+    with _APPS_LOCK:
+        if (app := _APPS.get(key)) is None:
+            with bind_token_cache(SerializableTokenCache()):
+                app = _APPS[key] = SharedClientApplication(**kwargs)
+        return app
+
+
+def token_server_error(result: dict[str, Any] | None) -> bool:
+    """If MSAL returned an error of an unavailable token endpoint."""
+    return bool(result and result.get("error") in TOKEN_SERVER_ERRORS)
 
 
 @dataclass
@@ -57,13 +180,33 @@ class AsyncMSAL:
     """
     app_kwargs: dict[str, Any] | None = None
     """ConfidentialClientApplication kwargs."""
+    redis: "Redis | None" = None
+    """Redis connection of the token cache (ENV.TOKEN_CACHE_REDIS). ENV.database."""
+    _token_cache_pending: str | None = field(default=None, init=False, repr=False)
+    """Serialized token cache to write to Redis."""
 
     client_session: ClassVar[ClientSession | None] = None
+    retry_policy: ClassVar[RetryPolicy | None] = retry
+    """Retry policy for request(). None to disable retries."""
+    token_refresher: ClassVar["TokenRefresher | None"] = None
+    """Refresh tokens of active sessions in the background. Optional."""
     token_cache_key: ClassVar[str] = "token_cache"
+    token_cache_ref_key: ClassVar[str] = "token_cache_ref"
+    """Session key with the Redis key of the token cache (ENV.TOKEN_CACHE_REDIS)."""
+    token_cache_redis_prefix: ClassVar[str] = "msal_token_cache_"
     user_email_key: ClassVar[str] = "mail"
     flow_cache_key: ClassVar[str] = "flow_cache"
     redirect_key: ClassVar[str] = "redirect"
     default_scopes: ClassVar[list[str]] = ["User.Read", "User.Read.All"]
+    scopes_key: ClassVar[str] = "scopes"
+    """Session key with the granted scopes, lower case & space separated."""
+    token_cache_keep: ClassVar[tuple[str, ...]] = (
+        "AccessToken",
+        "RefreshToken",
+        "Account",
+        "AppMetadata",
+    )
+    """Token cache credential types saved in the session. IdTokens are not used."""
 
     @classmethod
     async def from_request(
@@ -98,33 +241,113 @@ class AsyncMSAL:
             raise web.HTTPException(text=text) from None
 
     @cached_property
-    def app(self) -> ConfidentialClientApplication:
-        """Get the app."""
-        kwargs = {
-            "client_id": ENV.SP_APP_ID,
-            "client_credential": ENV.SP_APP_PW,
-            "authority": ENV.SP_AUTHORITY,
-            "validate_authority": False,
-            "token_cache": self.token_cache,
-        }
-        if self.app_kwargs:
-            kwargs.update(self.app_kwargs)
-        return ConfidentialClientApplication(**kwargs)
+    def app(self) -> SharedClientApplication:
+        """Get the shared app, bound to the session's token cache."""
+        return cast(
+            SharedClientApplication,
+            BoundClientApplication(get_app(self.app_kwargs), lambda: self.token_cache),
+        )
 
     @cached_property
     def token_cache(self) -> SerializableTokenCache:
         """Get the token_cache."""
+        if self.session.get(self.token_cache_ref_key):
+            raise RuntimeError(
+                "The token cache is stored in Redis, use async_load_token_cache()"
+            )
         res = SerializableTokenCache()
         if tc := self.session.get(self.token_cache_key):
             res.deserialize(tc)
         return res
 
+    async def async_load_token_cache(self) -> SerializableTokenCache:
+        """Get the token_cache, loading it from Redis if stored separately."""
+        if "token_cache" not in self.__dict__ and (
+            ref := self.session.get(self.token_cache_ref_key)
+        ):
+            res = SerializableTokenCache()
+            if blob := await (self.redis or ENV.database).get(ref):
+                res.deserialize(blob)
+            self.__dict__["token_cache"] = res
+        return self.token_cache
+
+    def compact_token_cache(self) -> int:
+        """Remove expired access tokens, duplicate accounts & unused credentials.
+
+        Returns the number of bytes saved in the serialized token cache.
+        """
+        tcache = self.token_cache
+        before = len(tcache.serialize())
+        ctypes = SerializableTokenCache.CredentialType
+        # search() removes expired access tokens
+        for ctype in (ctypes.ACCESS_TOKEN, ctypes.ACCESS_TOKEN_EXTENDED):
+            list(tcache.search(ctype))
+        accounts = set[str]()
+        for acc in list(tcache.search(ctypes.ACCOUNT)):
+            if acc.get("home_account_id") in accounts:
+                tcache.remove_account(acc)
+            accounts.add(acc.get("home_account_id"))
+        for ctype in (
+            ctypes.ACCESS_TOKEN,
+            ctypes.ACCESS_TOKEN_EXTENDED,
+            ctypes.REFRESH_TOKEN,
+            ctypes.ACCOUNT,
+            ctypes.ID_TOKEN,
+            ctypes.APP_METADATA,
+        ):
+            if ctype not in self.token_cache_keep:
+                for entry in list(tcache.search(ctype)):
+                    tcache.modify(ctype, entry)
+        saved = before - len(tcache.serialize())
+        if saved:
+            _LOG.debug("Token cache compacted: %s bytes saved", saved)
+        return saved
+
+    def granted_scopes(self) -> set[str]:
+        """Get the scopes of the access & refresh tokens, in lower case."""
+        ctypes = SerializableTokenCache.CredentialType
+        return {
+            scope.lower()
+            for ctype in (ctypes.ACCESS_TOKEN, ctypes.REFRESH_TOKEN)
+            for entry in self.token_cache.search(ctype)
+            for scope in (entry.get("target") or "").split()
+        }
+
     def save_token_cache(self) -> None:
         """Save the token cache if it changed."""
-        if self.token_cache.has_state_changed:
-            self.session[self.token_cache_key] = self.token_cache.serialize()
-            if self.save_callback:
-                self.save_callback(self.session)
+        if not self.token_cache.has_state_changed:
+            return
+        self.compact_token_cache()
+        if scopes := self.granted_scopes():
+            self.session[self.scopes_key] = " ".join(sorted(scopes))
+        blob = self.token_cache.serialize()
+        if ENV.TOKEN_CACHE_REDIS or self.session.get(self.token_cache_ref_key):
+            # Written by async_save_token_cache
+            self._token_cache_pending = blob
+            self.session.pop(self.token_cache_key, None)
+            if not self.session.get(self.token_cache_ref_key):
+                self.session[self.token_cache_ref_key] = (
+                    f"{self.token_cache_redis_prefix}{uuid4().hex}"
+                )
+        else:
+            self.session[self.token_cache_key] = blob
+        if self.save_callback:
+            self.save_callback(self.session)
+
+    async def async_save_token_cache(self) -> None:
+        """Write the token cache to Redis, if stored separately & changed.
+
+        It expires with the session. Without the creation time of dict sessions,
+        after ENV.SESSION_MAX_AGE.
+        """
+        if blob := self._token_cache_pending:
+            self._token_cache_pending = None
+            ttl = ENV.SESSION_MAX_AGE
+            if isinstance(self.session, Session):
+                ttl = session_ttl(self.session.created, self.session.max_age or ttl)
+            await (self.redis or ENV.database).set(
+                self.session[self.token_cache_ref_key], blob, ex=ttl
+            )
 
     def initiate_auth_code_flow(
         self,
@@ -135,16 +358,19 @@ class AsyncMSAL:
     ) -> str:
         """First step - Start the flow."""
         self.session.pop(self.token_cache_key, None)
+        self.session.pop(self.token_cache_ref_key, None)
         self.session.pop(self.user_email_key, None)
-        self.session[self.flow_cache_key] = res = self.app.initiate_auth_code_flow(
-            scopes or self.default_scopes,
-            redirect_uri=redirect_uri,
-            response_mode="form_post",
-            prompt=prompt,
-            **kwargs,
-            # max_age=1209600,
-            # max allowed 86400 - 1 day
-        )
+        with bind_token_cache(self.token_cache):
+            res = self.app.initiate_auth_code_flow(
+                scopes or self.default_scopes,
+                redirect_uri=redirect_uri,
+                response_mode="form_post",
+                prompt=prompt,
+                **kwargs,
+                # max_age=1209600,
+                # max allowed 86400 - 1 day
+            )
+        self.session[self.flow_cache_key] = res
         # https://msal-python.readthedocs.io/en/latest/#msal.ClientApplication.initiate_auth_code_flow
         return str(res["auth_uri"])
 
@@ -155,9 +381,10 @@ class AsyncMSAL:
         # Assume we have it in the cache (added by /login)
         # will raise KeyError if not in cache
         auth_code_flow = self.session.pop(self.flow_cache_key)
-        result = self.app.acquire_token_by_auth_code_flow(
-            auth_code_flow, auth_response, scopes=scopes
-        )
+        with bind_token_cache(self.token_cache):
+            result = self.app.acquire_token_by_auth_code_flow(
+                auth_code_flow, auth_response, scopes=scopes
+            )
         if "error" in result:
             raise web.HTTPBadRequest(text=str(result["error"]))
         if "id_token_claims" not in result:
@@ -165,25 +392,121 @@ class AsyncMSAL:
         self.save_token_cache()
         if tok := result.get("id_token_claims"):
             self.session[self.user_email_key] = tok.get("preferred_username")
+            self.oid = tok.get("oid", "")
 
     async def async_acquire_token_by_auth_code_flow(self, auth_response: Any) -> None:
         """Second step - Acquire token, async version."""
-        await asyncio.to_thread(self.acquire_token_by_auth_code_flow, auth_response)
+        await run_in_executor(self.acquire_token_by_auth_code_flow, auth_response)
+        await self.async_save_token_cache()
 
-    def get_token(self, scopes: list[str] | None = None) -> dict[str, Any] | None:
+    def get_token(
+        self, scopes: list[str] | None = None, force_refresh: bool = False
+    ) -> dict[str, Any] | None:
         """Acquire a token based on username."""
-        accounts = self.app.get_accounts()
-        if accounts:
-            result = self.app.acquire_token_silent(
-                scopes=scopes or self.default_scopes, account=accounts[0]
-            )
-            self.save_token_cache()
-            return result
-        return None
+        with bind_token_cache(self.token_cache):
+            accounts = self.app.get_accounts()
+            if not accounts:
+                return None
+            breaker = get_breaker(self.app.authority.instance)
+            kwargs = {
+                "scopes": scopes or self.default_scopes,
+                "account": accounts[0],
+                "force_refresh": force_refresh,
+            }
+            if breaker is None:
+                result = self.app.acquire_token_silent(**kwargs)
+            else:
+                result = breaker.call(
+                    self.app.acquire_token_silent, failed=token_server_error, **kwargs
+                )
+        self.save_token_cache()
+        return result
+
+    def get_cached_token(
+        self, scopes: list[str] | None = None
+    ) -> dict[str, Any] | None:
+        """Get a valid access token from the token cache, without MSAL.
+
+        Returns None if there is no access token or if it should be refreshed.
+        """
+        client_id = (self.app_kwargs or {}).get("client_id", ENV.SP_APP_ID)
+        now = time.time()
+        valid = list[dict[str, Any]]()
+        for entry in self.token_cache.search(
+            SerializableTokenCache.CredentialType.ACCESS_TOKEN,
+            target=scopes or self.default_scopes,
+            query={"client_id": client_id},
+        ):
+            if "key_id" in entry or "ext_cache_key" in entry:
+                continue
+            if int(entry["expires_on"]) - now < TOKEN_EXPIRY_MARGIN:
+                continue
+            if "refresh_on" in entry and int(entry["refresh_on"]) < now:
+                return None  # Aging, let MSAL refresh it
+            valid.append(entry)
+        if len({e.get("home_account_id") for e in valid}) != 1:
+            return None  # No token, or multiple accounts for MSAL to choose from
+        entry = max(valid, key=lambda e: int(e["expires_on"]))
+        return {
+            "access_token": entry["secret"],
+            "token_type": entry.get("token_type", "Bearer"),
+            "expires_in": int(int(entry["expires_on"]) - now),
+            "token_source": "cache",
+        }
 
     async def async_get_token(self) -> dict[str, Any] | None:
-        """Acquire a token based on username."""
-        return await asyncio.to_thread(self.get_token)
+        """Acquire a token based on username.
+
+        A valid access token in the token cache is returned without an executor
+        thread, MSAL is only used when the token needs a refresh.
+        """
+        if self.token_refresher:
+            self.token_refresher.touch(self)
+        await self.async_load_token_cache()
+        if token := self.get_cached_token():
+            return token
+        return await self.async_refresh_token()
+
+    async def async_refresh_token(
+        self, force_refresh: bool = False
+    ) -> dict[str, Any] | None:
+        """Acquire a token with MSAL in a thread, once per account & scopes.
+
+        Concurrent callers for the same account share a single refresh. Other
+        sessions of the account save the refreshed token cache as well, callers
+        sharing the refreshing session load it without flagging a change.
+        """
+        await self.async_load_token_cache()
+        client_id = (self.app_kwargs or {}).get("client_id", ENV.SP_APP_ID)
+        account = next(
+            self.token_cache.search(SerializableTokenCache.CredentialType.ACCOUNT),
+            None,
+        )
+        if account is None:
+            return await run_in_executor(self.get_token, force_refresh=force_refresh)
+        key = (client_id, account["home_account_id"], *sorted(self.default_scopes))
+
+        if task := _REFRESHES.get(key):
+            result, cache, session = await asyncio.shield(task)
+            if cache:
+                self.token_cache.deserialize(cache)
+                if session is not self.session:
+                    self.token_cache.has_state_changed = True
+                    self.save_token_cache()
+                    await self.async_save_token_cache()
+            return result
+
+        async def refresh() -> tuple[
+            dict[str, Any] | None, str, Session | dict[str, Any]
+        ]:
+            result = await run_in_executor(self.get_token, force_refresh=force_refresh)
+            await self.async_save_token_cache()
+            return result, self.token_cache.serialize(), self.session
+
+        task = _REFRESHES[key] = asyncio.create_task(refresh())
+        task.add_done_callback(lambda _: _REFRESHES.pop(key, None))
+        result, _, _ = await asyncio.shield(task)
+        return result
 
     async def request(
         self, method: HttpMethods, url: StrOrURL, **kwargs: Unpack[_RequestOptions]
@@ -217,12 +540,48 @@ class AsyncMSAL:
         elif method in [HTTP_POST, HTTP_PUT, HTTP_PATCH]:
             headers["Content-type"] = "application/json"
             if "data" in kwargs:
-                kwargs["data"] = ENV.json_dumps(kwargs["data"])  # auto convert to json
+                kwargs["data"] = ENV.json_dumpb(kwargs["data"])  # auto convert to json
 
         if not AsyncMSAL.client_session:
-            AsyncMSAL.client_session = ClientSession(trust_env=True)
+            AsyncMSAL.client_session = create_client_session()
 
-        return await AsyncMSAL.client_session.request(method, url, **kwargs)
+        cses = AsyncMSAL.client_session
+        host = URL(url).host or ""
+        limiter = get_limiter(
+            host, (self.app_kwargs or {}).get("client_id", ENV.SP_APP_ID)
+        )
+        breaker = get_breaker(host)
+
+        async def send() -> ClientResponse:
+            # Limiter rejections are local, not failures of the host
+            if limiter is None:
+                return await guarded()
+            async with limiter.acquire():
+                return await guarded()
+
+        async def guarded() -> ClientResponse:
+            if breaker is None:
+                return await cses.request(method, url, **kwargs)
+            breaker.allow()
+            try:
+                res = await cses.request(method, url, **kwargs)
+            except Exception:
+                breaker.failure()
+                raise
+            except BaseException:
+                breaker.release()
+                raise
+            if res.status >= 500:
+                breaker.failure()
+            else:
+                breaker.success()
+            return res
+
+        if self.retry_policy is None:
+            return await send()
+        return await self.retry_policy.send(
+            send, idempotent=method in (HTTP_GET, HTTP_PUT, HTTP_DELETE)
+        )
 
     def request_ctx(
         self, method: HttpMethods, url: StrOrURL, **kwargs: Unpack[_RequestOptions]
@@ -233,6 +592,67 @@ class AsyncMSAL:
     get = partialmethod(request_ctx, HTTP_GET)
     post = partialmethod(request_ctx, HTTP_POST)
 
+    def cache_identity(self) -> str:
+        """Get the account of the token cache. Empty if none or multiple."""
+        accounts = {
+            acc.get("home_account_id", "")
+            for acc in self.token_cache.search(
+                SerializableTokenCache.CredentialType.ACCOUNT
+            )
+        }
+        return accounts.pop() if len(accounts) == 1 else ""
+
+    async def cached_get(
+        self,
+        url: str,
+        *,
+        params: Mapping[str, str] | None = None,
+        headers: Mapping[str, str] | None = None,
+    ) -> CachedResponse:
+        """GET url & read the response, using the response cache.
+
+        With ENV.RESPONSE_CACHE responses are cached per user. Fresh responses
+        (Cache-Control max-age) are returned without a request, others are
+        revalidated with If-None-Match/If-Modified-Since.
+        """
+        if params:
+            url = str(URL(url).update_query(params))
+        key = ""
+        if cache := get_response_cache():
+            await self.async_load_token_cache()
+            if identity := self.cache_identity():
+                key = cache.key(identity, url)
+        entry = await cache.get(key) if cache and key else None
+        if entry and entry.fresh:
+            return entry
+
+        hdrs = {**(headers or {}), **(entry.validators() if entry else {})}
+        async with self.get(url, headers=hdrs) as res:
+            if cache and entry and res.status == web.HTTPNotModified.status_code:
+                return await cache.revalidated(key, entry, res)
+            result = await CachedResponse.from_response(res)
+        if cache and key and result.storable:
+            await cache.set(key, result)
+        return result
+
+    def batch(self) -> GraphBatch:
+        """Collect MS Graph requests & send them as $batch requests."""
+        return GraphBatch(self)
+
+    def iter_collection(
+        self,
+        url: str,
+        *,
+        top: int = 0,
+        select: Sequence[str] = (),
+        max_items: int = 0,
+    ) -> AsyncGenerator[dict[str, Any]]:
+        """Iterate over the items of a MS Graph collection, prefetching pages.
+
+        url can be relative to https://graph.microsoft.com/v1.0
+        """
+        return iter_collection(self, url, top=top, select=select, max_items=max_items)
+
     @property
     def authenticated(self) -> bool:
         """If the user is logged in."""
@@ -243,6 +663,8 @@ class AsyncMSAL:
     manager_name = dict_property("session", "m_name")
     manager_mail = dict_property("session", "m_mail")
     redirect = dict_property("session", redirect_key)
+    oid = dict_property("session", "oid")
+    """The user's object id, from the id_token claims."""
 
     async def async_acquire_token_by_auth_code_flow_plus(
         self,
@@ -292,10 +714,10 @@ class AsyncMSAL:
 
         if not msg:
             try:
-                if get_info in ("user", "manager"):
+                if get_info == "user":
                     await helpers.get_user_info(self)
-                if get_info == "manager":
-                    await helpers.get_manager_info(self)
+                elif get_info == "manager":
+                    await helpers.get_user_and_manager_info(self)
             except Exception as err:
                 msg.append("Could not get org info from MS graph")
                 msg.append(str(err))
@@ -303,6 +725,7 @@ class AsyncMSAL:
                 self.name = ""
 
             if self.session.get("mail"):
+                await index_session(self.session)
                 for lcb in ENV.login_callback:
                     await lcb(self)
 
@@ -3,18 +3,163 @@
 import asyncio
 import logging
 import time
-from collections.abc import AsyncGenerator
-from contextlib import AsyncExitStack, asynccontextmanager
+from collections.abc import AsyncGenerator, Awaitable, Callable
+from contextlib import AsyncExitStack, aclosing, asynccontextmanager
 from typing import Any
+from weakref import WeakKeyDictionary
 
-from redis.asyncio import Redis, from_url
+from aiohttp import web
+from redis.asyncio import Redis, RedisCluster, Sentinel, from_url
+from redis.commands.core import AsyncScript
 
+from aiohttp_msal.codec import MAGIC, decode_session, encode_session, session_ttl
 from aiohttp_msal.msal_async import AsyncMSAL
+from aiohttp_msal.session_index import (
+    MAIL_INDEX_PREFIX,
+    index_add,
+    index_sessions,
+    mail_index_key,
+    mget,
+)
 from aiohttp_msal.settings import ENV
 
 _LOG = logging.getLogger(__name__)
 
 SES_KEYS = ("mail", "name", "m_mail", "m_name")
+SCAN_BATCH = 100
+"""Keys per SCAN & MGET round trip."""
+SCAN_CONCURRENCY = 4
+"""Redis Cluster primaries scanned concurrently."""
+SAVE_DELAY = 0.1
+"""Seconds to coalesce saves of the same session by async_msal_factory."""
+
+type FetchValues = Callable[[list[str]], Awaitable[list[tuple[str, bytes | None]]]]
+type PendingSession = tuple[int, dict[str, Any], AsyncMSAL, Redis | None]
+"""created, session, AsyncMSAL instance & the connection to write it to."""
+
+SESSION_SCRIPT = r"""
+-- Check sessions in Redis. Compressed sessions are returned to the client.
+-- KEYS: session keys
+-- ARGV: mode ("match" or "clean"), JSON object of substrings to match,
+--       minimum created, JSON list of required session keys, mail index prefix,
+--       compressed session magic (codec.MAGIC), token cache reference session key
+-- Returns: removed, kept, key1, value1, key2, value2...
+local mode, match, min_created = ARGV[1], cjson.decode(ARGV[2]), tonumber(ARGV[3])
+local required, prefix, magic = cjson.decode(ARGV[4]), ARGV[5], ARGV[6]
+local ref_key = ARGV[7]
+local res, removed, kept = {0, 0}, 0, 0
+for _, key in ipairs(KEYS) do
+  local val = redis.call("GET", key)
+  if val and string.sub(val, 1, #magic) == magic then
+    table.insert(res, key)
+    table.insert(res, val)
+  elseif val then
+    local ok, data = pcall(cjson.decode, val)
+    local ses = ok and type(data) == "table" and data["session"]
+    local valid = type(ses) == "table" and type(data["created"]) == "number"
+    if mode == "clean" then
+      if valid and data["created"] < min_created then valid = false end
+      for _, k in ipairs(required) do
+        if valid and ses[k] == nil then valid = false end
+      end
+      if valid then
+        kept = kept + 1
+      else
+        redis.call("UNLINK", key)
+        removed = removed + 1
+        if type(ses) == "table" and type(ses["mail"]) == "string" then
+          local mail = string.lower(string.match(ses["mail"], "^%s*(.-)%s*$"))
+          redis.call("SREM", prefix .. mail, key)
+        end
+        if type(ses) == "table" and type(ses[ref_key]) == "string" then
+          redis.call("UNLINK", ses[ref_key])
+        end
+      end
+    elseif valid then
+      for k, v in pairs(match) do
+        if not (type(ses[k]) == "string" and string.find(ses[k], v, 1, true)) then
+          valid = false
+        end
+      end
+      if valid then
+        table.insert(res, key)
+        table.insert(res, val)
+      end
+    end
+  end
+end
+res[1], res[2] = removed, kept
+return res
+"""
+"""Lua script to match or clean sessions without transferring them."""
+
+
+def _session_script(redis: Redis) -> AsyncScript:
+    """Register SESSION_SCRIPT. Not supported on a Redis Cluster."""
+    if isinstance(redis, RedisCluster):
+        raise ValueError("server_side is not supported on a Redis Cluster")
+    return redis.register_script(SESSION_SCRIPT)
+
+
+async def _run_script(  # noqa: PLR0913
+    script: AsyncScript,
+    keys: list[str],
+    mode: str,
+    *,
+    match: dict[str, str] | None = None,
+    min_created: int = 0,
+    required: list[str] | None = None,
+) -> tuple[int, int, list[tuple[str, bytes | None]]]:
+    """Run SESSION_SCRIPT. Returns removed, kept & the returned sessions."""
+    res = await script(
+        keys=keys,
+        args=[
+            mode,
+            ENV.json_dumps(match or {}),
+            min_created,
+            ENV.json_dumps(required or []),
+            MAIL_INDEX_PREFIX,
+            MAGIC,
+            AsyncMSAL.token_cache_ref_key,
+        ],
+    )
+    pairs = [
+        (key if isinstance(key, str) else key.decode(), val)
+        for key, val in zip(res[2::2], res[3::2], strict=True)
+    ]
+    return int(res[0]), int(res[1]), pairs
+
+
+def redis_from_url(url: str) -> Redis:
+    """Connect to Redis, a Redis Cluster or the master of a Redis Sentinel service.
+
+    - redis://host:port/db (or rediss://, unix://)
+    - redis+cluster://[user:password@]host:port (or rediss+cluster://)
+    - redis+sentinel://[user:password@]host:port[,host:port]/service[/db]
+    """
+    scheme, _, rest = url.partition("://")
+    if scheme.endswith("+cluster"):
+        url = f"{scheme.removesuffix('+cluster')}://{rest}"
+        return RedisCluster.from_url(url)  # type: ignore[return-value]
+    if not scheme.endswith("+sentinel"):
+        return from_url(url)
+    auth, _, rest = rest.rpartition("@")
+    hosts, _, path = rest.partition("/")
+    service, _, db = path.strip("/").partition("/")
+    if not service:
+        raise ValueError(f"No Sentinel service name in {scheme}://{rest}")
+    username, _, password = auth.rpartition(":")
+    sentinels = [
+        (host, int(port or 26379))
+        for host, _, port in (h.partition(":") for h in hosts.split(","))
+    ]
+    return Sentinel(sentinels).master_for(  # type: ignore[no-any-return]
+        service,
+        db=int(db or 0),
+        username=username or None,
+        password=password or None,
+        ssl=scheme.startswith("rediss"),
+    )
 
 
 @asynccontextmanager
@@ -25,7 +170,7 @@ async def get_redis() -> AsyncGenerator[Redis, None]:
         yield ENV.database
         return
     _LOG.info("Connect to Redis %s", ENV.REDIS)
-    redis = from_url(ENV.REDIS)  # decode_responses=True not allowed aiohttp_session
+    redis = redis_from_url(ENV.REDIS)  # decode_responses not allowed aiohttp_session
     ENV.database = redis
     try:
         yield redis
@@ -34,105 +179,511 @@ async def get_redis() -> AsyncGenerator[Redis, None]:
         await redis.aclose()  # type:ignore[attr-defined]
 
 
+async def scan_values(
+    redis: Redis,
+    /,
+    *,
+    key_match: str | None = None,
+    batch_size: int = SCAN_BATCH,
+    fetch_values: FetchValues | None = None,
+    concurrency: int = SCAN_CONCURRENCY,
+) -> AsyncGenerator[list[tuple[str, bytes | None]], None]:
+    """Iterate over batches of Redis keys & their values.
+
+    Keys are fetched with a single MGET per batch, or with fetch_values. The next
+    batch is scanned & fetched in the background while the current batch is
+    processed. On a Redis Cluster the primaries are scanned in parallel, at most
+    concurrency at a time.
+    key_match: Filter the Redis keys. Defaults to ENV.cookie_name
+    """
+    queue = asyncio.Queue[list[tuple[str, bytes | None]] | Exception | None](1)
+
+    async def put(keys: list[str]) -> None:
+        if fetch_values:
+            await queue.put(await fetch_values(keys))
+        else:
+            await queue.put(list(zip(keys, await mget(redis, keys), strict=True)))
+
+    async def scan(**kwargs: Any) -> None:
+        batch = list[str]()
+        async for key in redis.scan_iter(
+            count=batch_size, match=key_match or f"{ENV.COOKIE_NAME}*", **kwargs
+        ):
+            batch.append(key if isinstance(key, str) else key.decode())
+            if len(batch) >= batch_size:
+                await put(batch)
+                batch = []
+        if batch:
+            await put(batch)
+
+    async def scan_cluster(cluster: RedisCluster) -> None:
+        limit = asyncio.Semaphore(concurrency)
+
+        async def scan_node(node: Any) -> None:
+            async with limit:
+                await scan(target_nodes=node)
+
+        try:
+            async with asyncio.TaskGroup() as tg:
+                for node in cluster.get_primaries():
+                    tg.create_task(scan_node(node))
+        except ExceptionGroup as err:
+            raise err.exceptions[0] from None
+
+    async def fetch() -> None:
+        try:
+            if isinstance(redis, RedisCluster):
+                await scan_cluster(redis)
+            else:
+                await scan()
+            await queue.put(None)
+        except Exception as err:
+            await queue.put(err)
+
+    task = asyncio.create_task(fetch())
+    try:
+        while (batch := await queue.get()) is not None:
+            if isinstance(batch, Exception):
+                raise batch
+            yield batch
+    finally:
+        task.cancel()
+
+
+def _decode(sval: bytes | None) -> tuple[int, dict[str, Any]]:
+    """Decode a session to (created, session). (0, {}) if invalid."""
+    try:
+        val = decode_session(sval)  # type: ignore[arg-type]
+        return int(val["created"]), val["session"]
+    except Exception:
+        return 0, {}
+
+
 async def session_iter(
     redis: Redis,
     /,
     *,
     match: dict[str, str] | None = None,
     key_match: str | None = None,
+    batch_size: int = SCAN_BATCH,
+    server_side: bool = False,
 ) -> AsyncGenerator[tuple[str, int, dict[str, Any]], None]:
     """Iterate over the Redis keys to find a specific session.
 
     match: Filter based on session content (i.e. mail/name)
     key_match: Filter the Redis keys. Defaults to ENV.cookie_name
+    batch_size: Keys fetched per Redis round trip
+    server_side: Match sessions in Redis with a Lua script, only matching
+        sessions are transferred
     """
     if match and not all(isinstance(v, str) for v in match.values()):
         raise ValueError("match values must be strings")
-    async for key in redis.scan_iter(
-        count=100, match=key_match or f"{ENV.COOKIE_NAME}*"
+    fetch_values = None
+    if server_side and match:
+        script = _session_script(redis)
+
+        async def fetch_values(keys: list[str]) -> list[tuple[str, bytes | None]]:
+            return (await _run_script(script, keys, "match", match=match))[2]
+
+    async for batch in scan_values(
+        redis, key_match=key_match, batch_size=batch_size, fetch_values=fetch_values
     ):
-        if not isinstance(key, str):
-            key = key.decode()
-        sval = await redis.get(key)
-        created, ses = 0, {}
-        try:
-            val = ENV.json_loads(sval)  # type: ignore[arg-type]
-            created = int(val["created"])
-            ses = val["session"]
-        except Exception:
-            pass
-        if match:
-            # Ensure we match all the supplied terms
-            matches = 0
-            for mkey, mval in match.items():
-                if not (isinstance(ses.get(mkey), str) and mval in ses[mkey]):
-                    break
-                matches += 1
-            if matches != len(match):
-                continue
-        yield key, created, ses
+        for key, sval in batch:
+            created, ses = _decode(sval)
+            if match:
+                # Ensure we match all the supplied terms
+                matches = 0
+                for mkey, mval in match.items():
+                    if not (isinstance(ses.get(mkey), str) and mval in ses[mkey]):
+                        break
+                    matches += 1
+                if matches != len(match):
+                    continue
+            yield key, created, ses
+
 
+class BatchUnlink:
+    """Remove sessions, their token caches & mail index entries with UNLINK.
+
+    Removes at most ops_per_sec keys per second, to limit the load on Redis.
+    0 for no limit.
+    """
 
-async def session_clean(
-    redis: Redis, /, *, max_age: int = 90, expected_keys: dict[str, Any] | None = None
+    def __init__(
+        self, redis: Redis, *, batch_size: int = SCAN_BATCH, ops_per_sec: int = 0
+    ) -> None:
+        """Initialize."""
+        self.redis = redis
+        self.batch_size = batch_size
+        self.ops_per_sec = ops_per_sec
+        self.pending = list[tuple[str, str, str]]()
+        self.removed = 0
+        self._next = 0.0
+
+    async def add(self, key: str, mail: str = "", ref: str = "") -> None:
+        """Remove a key, with the session's mail & token cache reference."""
+        self.pending.append((key, mail, ref))
+        if len(self.pending) >= self.batch_size:
+            await self.flush()
+
+    async def pace(self, count: int) -> None:
+        """Wait until count keys can be removed within ops_per_sec."""
+        if not self.ops_per_sec:
+            return
+        now = time.monotonic()
+        self._next = max(self._next, now)
+        if (wait := self._next - now) > 0:
+            await asyncio.sleep(wait)
+        self._next += count / self.ops_per_sec
+
+    async def flush(self) -> None:
+        """Remove the pending keys."""
+        if not self.pending:
+            return
+        batch, self.pending = self.pending, []
+        await self.pace(len(batch))
+        keys = [k for key, _, ref in batch for k in (key, ref) if k]
+        pipe = self.redis.pipeline(transaction=False)
+        if isinstance(self.redis, RedisCluster):
+            for key in keys:  # keys are in different hash slots
+                pipe.unlink(key)
+        else:
+            pipe.unlink(*keys)
+        for key, mail, _ in batch:
+            if mail:
+                pipe.srem(mail_index_key(mail), key)
+        await pipe.execute()
+        self.removed += len(batch)
+
+
+async def session_clean(  # noqa: PLR0913
+    redis: Redis,
+    /,
+    *,
+    max_age: int = 90,
+    expected_keys: dict[str, Any] | None = None,
+    batch_size: int = SCAN_BATCH,
+    ops_per_sec: int = 0,
+    server_side: bool = False,
 ) -> None:
-    """Clear session entries older than max_age days."""
-    rem, keep = 0, 0
+    """Clear session entries older than max_age days or without expected_keys.
+
+    Sessions with a Redis TTL (see session_expire) expire by themselves, this
+    removes the remaining invalid sessions & their token caches, at most
+    ops_per_sec per second. Token caches without a TTL, orphaned by older versions,
+    expire after max_age days.
+    server_side: Check & remove sessions in Redis with a Lua script. Only
+        compressed sessions are transferred & checked here.
+    """
+    keep = 0
     expire = int(time.time() - max_age * 24 * 60 * 60)
+    required = list(expected_keys or SES_KEYS)
+    unlink = BatchUnlink(redis, batch_size=batch_size, ops_per_sec=ops_per_sec)
+    fetch_values = None
+    if server_side:
+        script = _session_script(redis)
+
+        async def fetch_values(keys: list[str]) -> list[tuple[str, bytes | None]]:
+            nonlocal keep
+            await unlink.pace(len(keys))
+            removed, kept, res = await _run_script(
+                script, keys, "clean", min_created=expire, required=required
+            )
+            unlink.removed += removed
+            keep += kept
+            return res
+
     try:
-        async for key, created, ses in session_iter(redis):
-            all_keys = all(sk in ses for sk in (expected_keys or SES_KEYS))
-            if created < expire or not all_keys:
-                rem += 1
-                await redis.delete(key)
-            else:
-                keep += 1
+        async for batch in scan_values(
+            redis, batch_size=batch_size, fetch_values=fetch_values
+        ):
+            for key, sval in batch:
+                created, ses = _decode(sval)
+                if created < expire or not all(sk in ses for sk in required):
+                    await unlink.add(
+                        key,
+                        ses.get("mail", ""),
+                        ses.get(AsyncMSAL.token_cache_ref_key, ""),
+                    )
+                else:
+                    keep += 1
+        await unlink.flush()
+        await token_cache_expire(redis, max_age * 24 * 60 * 60, batch_size=batch_size)
     finally:
-        if rem:
-            _LOG.info("Sessions removed: %s (%s total)", rem, keep)
+        if unlink.removed:
+            _LOG.info("Sessions removed: %s (%s total)", unlink.removed, keep)
         else:
             _LOG.debug("No sessions removed (%s total)", keep)
 
 
-async def invalid_sessions(redis: Redis, /) -> None:
-    """Find & clean invalid sessions."""
-    async for key in redis.scan_iter(count=100, match=f"{ENV.COOKIE_NAME}*"):
-        if not isinstance(key, str):
-            key = key.decode()
-        sval = await redis.get(key)
-        if sval is None:
-            continue
+async def session_expire(
+    redis: Redis, /, *, max_age: int = 0, batch_size: int = SCAN_BATCH
+) -> int:
+    """Set the Redis TTL of all sessions & token caches, max_age after creation.
+
+    A one-off migration for sessions saved without a TTL. max_age defaults to
+    ENV.SESSION_MAX_AGE. Returns the number of sessions updated.
+    """
+    max_age = max_age or ENV.SESSION_MAX_AGE
+    cnt = 0
+    async for batch in scan_values(redis, batch_size=batch_size):
+        pipe = redis.pipeline(transaction=False)
+        for key, sval in batch:
+            created, ses = _decode(sval)
+            if not created:
+                continue  # Removed by session_clean/invalid_sessions
+            pipe.expire(key, session_ttl(created, max_age))
+            if ref := ses.get(AsyncMSAL.token_cache_ref_key):
+                pipe.expire(ref, session_ttl(created, max_age))
+            cnt += 1
+        await pipe.execute()
+    _LOG.info("Set the TTL of %s sessions", cnt)
+    return cnt
+
+
+async def token_cache_expire(
+    redis: Redis, max_age: int, /, *, batch_size: int = SCAN_BATCH
+) -> int:
+    """Expire token caches without a TTL after max_age seconds.
+
+    Sessions expire before their token cache, so referenced caches are kept.
+    Returns the number of token caches updated.
+    """
+    cnt = 0
+    batch = list[str]()
+
+    async def expire() -> None:
+        nonlocal cnt
+        pipe = redis.pipeline(transaction=False)
+        for key in batch:
+            pipe.ttl(key)
+        ttls = await pipe.execute()
+        pipe = redis.pipeline(transaction=False)
+        for key, ttl in zip(batch, ttls, strict=True):
+            if ttl == -1:
+                pipe.expire(key, max_age)
+                cnt += 1
+        await pipe.execute()
+        batch.clear()
+
+    async for key in redis.scan_iter(
+        count=batch_size, match=f"{AsyncMSAL.token_cache_redis_prefix}*"
+    ):
+        batch.append(key if isinstance(key, str) else key.decode())
+        if len(batch) >= batch_size:
+            await expire()
+    if batch:
+        await expire()
+    if cnt:
+        _LOG.info("Token caches without a TTL: %s", cnt)
+    return cnt
+
+
+async def invalid_sessions(
+    redis: Redis,
+    /,
+    *,
+    batch_size: int = SCAN_BATCH,
+    ops_per_sec: int = 0,
+    server_side: bool = False,
+) -> None:
+    """Find & clean invalid sessions.
+
+    server_side: Check & remove sessions in Redis with a Lua script.
+    """
+    unlink = BatchUnlink(redis, batch_size=batch_size, ops_per_sec=ops_per_sec)
+    fetch_values = None
+    if server_side:
+        script = _session_script(redis)
+
+        async def fetch_values(keys: list[str]) -> list[tuple[str, bytes | None]]:
+            await unlink.pace(len(keys))
+            removed, _, res = await _run_script(script, keys, "clean")
+            unlink.removed += removed
+            return res
+
+    async for batch in scan_values(
+        redis, batch_size=batch_size, fetch_values=fetch_values
+    ):
+        for key, sval in batch:
+            if sval is None:
+                continue
+            try:
+                val: dict = decode_session(sval)
+                assert isinstance(val["created"], int)
+                assert isinstance(val["session"], dict)
+            except Exception as err:
+                _LOG.warning("Removing session %s: %s", key, err)
+                await unlink.add(key)
+    await unlink.flush()
+    if unlink.removed:
+        _LOG.info("Invalid sessions removed: %s", unlink.removed)
+
+
+class SessionWriter:
+    """Write-behind queue for sessions saved by async_msal_factory.
+
+    Saves of the same key within delay seconds are coalesced and written with
+    pipelined SET commands, batch_size at a time, on the connection each session
+    was loaded from (get_redis() if none). Pending sessions are also written when
+    the event loop shuts down (asyncio.run) before the delay. Call drain(), or use
+    session_writer_ctx, to wait for all writes.
+    """
+
+    def __init__(self, *, delay: float = SAVE_DELAY, batch_size: int = SCAN_BATCH):
+        """Initialize."""
+        self.delay = delay
+        self.batch_size = batch_size
+        self.pending = dict[str, PendingSession]()
+        self.tasks = set[asyncio.Task[None]]()
+        self.written = 0
+        self._timer: asyncio.Task[None] | None = None
+
+    def add(
+        self,
+        key: str,
+        created: int,
+        session: dict[str, Any],
+        ses: AsyncMSAL,
+        redis: Redis | None = None,
+    ) -> None:
+        """Queue a session. Must be called from the event loop."""
+        self.pending[key] = (created, session, ses, redis)
+        if self._timer is None or self._timer.done():
+            self._timer = self._track(self._flush_later())
+
+    def _track(self, coro: Awaitable[None]) -> asyncio.Task[None]:
+        task = asyncio.ensure_future(coro)
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+        return task
+
+    async def _flush_later(self) -> None:
         try:
-            val: dict = ENV.json_loads(sval)
-            assert isinstance(val["created"], int)
-            assert isinstance(val["session"], dict)
-        except Exception as err:
-            _LOG.warning("Removing session %s: %s", key, err)
-            await redis.delete(key)
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            # drain() or the loop is shutting down, write before it closes
+            self._timer = None
+            await self._flush_logged()
+            raise
+        self._timer = None
+        await self._flush_logged()
+
+    async def _flush_logged(self) -> None:
+        try:
+            await self.flush()
+        except Exception:
+            _LOG.exception("Could not save sessions, %s pending", len(self.pending))
+
+    async def flush(self) -> None:
+        """Write the pending sessions. Failed sessions remain pending."""
+        while self.pending:
+            keys = list(self.pending)[: self.batch_size]
+            batch = {key: self.pending.pop(key) for key in keys}
+            try:
+                await self.write(batch)
+            except BaseException:
+                for key, item in batch.items():  # keep newer saves
+                    self.pending.setdefault(key, item)
+                raise
+
+    async def write(self, batch: dict[str, PendingSession]) -> None:
+        """Write sessions & their token caches, grouped by connection."""
+        groups = dict[int, tuple[Redis | None, dict[str, PendingSession]]]()
+        for key, item in batch.items():
+            groups.setdefault(id(item[3]), (item[3], {}))[1][key] = item
+        for redis, items in groups.values():
+            if redis is None:
+                async with get_redis() as default:
+                    await self._write(default, items)
+            else:
+                await self._write(redis, items)
+        self.written += len(batch)
+
+    @staticmethod
+    async def _write(redis: Redis, batch: dict[str, PendingSession]) -> None:
+        await asyncio.gather(
+            *(ses.async_save_token_cache() for _, _, ses, _ in batch.values())
+        )
+        pipe = redis.pipeline(transaction=False)
+        for key, (created, session, _, _) in batch.items():
+            pipe.set(
+                key,
+                encode_session({"created": created, "session": session}),
+                ex=session_ttl(created, ENV.SESSION_MAX_AGE),
+            )
+        await pipe.execute()
+
+    async def drain(self) -> None:
+        """Write all pending sessions & wait for in-flight writes."""
+        if self._timer:
+            self._timer.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        await self.flush()
+
+
+_WRITERS = WeakKeyDictionary[asyncio.AbstractEventLoop, SessionWriter]()
+
+
+def get_session_writer() -> SessionWriter:
+    """Get the session writer of the running event loop."""
+    loop = asyncio.get_running_loop()
+    if (writer := _WRITERS.get(loop)) is None:
+        writer = _WRITERS[loop] = SessionWriter()
+    return writer
+
+
+async def session_writer_ctx(_: web.Application) -> AsyncGenerator[None]:
+    """Write the pending sessions when the app stops."""
+    yield
+    await get_session_writer().drain()
 
 
 def async_msal_factory[T: AsyncMSAL](
-    cls: type[T], key: str, created: int, session: dict[str, Any], /
+    cls: type[T],
+    key: str,
+    created: int,
+    session: dict[str, Any],
+    /,
+    *,
+    redis: Redis | None = None,
 ) -> T:
     """Create a AsyncMSAL session with a save_callback.
 
     When get_token refreshes the token retrieved from Redis, the save_cache callback
-    will be responsible to update the cache in Redis.
+    queues the session in the SessionWriter, to update it in Redis. The callback
+    can be called from the MSAL executor threads.
     """
+    try:
+        loop: asyncio.AbstractEventLoop | None = asyncio.get_running_loop()
+    except RuntimeError:
+        loop = None
 
-    async def async_save_cache(_: dict) -> None:
-        """Save the token cache to Redis."""
-        async with get_redis() as rd2:
-            await rd2.set(key, ENV.json_dumps({"created": created, "session": session}))
+    def add() -> None:
+        get_session_writer().add(key, created, session, ses, redis)
 
-    def save_cache(*args: Any) -> None:
-        """Save the token cache to Redis."""
+    def save_cache(*_: Any) -> None:
+        """Save the session & token cache to Redis."""
         try:
-            asyncio.get_event_loop().create_task(async_save_cache(*args))
+            asyncio.get_running_loop()
         except RuntimeError:
-            asyncio.run(async_save_cache(*args))
+            if loop and loop.is_running():
+                loop.call_soon_threadsafe(add)
+            else:  # No event loop, write now
+                asyncio.run(
+                    SessionWriter().write({key: (created, session, ses, redis)})
+                )
+            return
+        add()
 
-    return cls(session, save_callback=save_cache)
+    ses = cls(session, save_callback=save_cache, redis=redis)
+    return ses
+
+
+def has_scope(scopes: str, scope: str) -> bool:
+    """If scope is in the space separated scopes, with or without resource URI."""
+    scope = scope.lower()
+    return any(s == scope or s.endswith(f"/{scope}") for s in scopes.lower().split())
 
 
 async def get_session[T: AsyncMSAL](
@@ -142,21 +693,76 @@ async def get_session[T: AsyncMSAL](
     *,
     redis: Redis | None = None,
     scope: str = "",
+    scan: bool = False,
 ) -> T:
-    """Get a session from Redis."""
-    cnt = 0
+    """Get a session from Redis.
+
+    Sessions are looked up in the mail index, run session_index_rebuild once to
+    index sessions created before the index. If none matches & scan is set, all
+    sessions are scanned and a matching session is added to the index.
+    """
+    seen = set[str]()
     async with AsyncExitStack() as stack:
         if redis is None:
             redis = await stack.enter_async_context(get_redis())
-        async for key, created, session in session_iter(redis, match={"mail": email}):
-            cnt += 1
-            if scope and scope not in str(session.get(cls.token_cache_key)).lower():
-                continue
-            return async_msal_factory(cls, key, created, session)
+
+        async def check(key: str, created: int, session: dict[str, Any]) -> T | None:
+            seen.add(key)
+            scopes = session.get(cls.scopes_key)
+            if scope and scopes is not None and not has_scope(scopes, scope):
+                return None
+            ses = async_msal_factory(cls, key, created, session, redis=redis)
+            await ses.async_load_token_cache()
+            if (
+                scope
+                and scopes is None
+                and scope not in ses.token_cache.serialize().lower()
+            ):
+                return None  # Session saved before the scopes key
+            return ses
+
+        for key, created, session in await index_sessions(redis, email):
+            if ses := await check(key, created, session):
+                return ses
+
+        if scan:
+            sessions = await stack.enter_async_context(
+                aclosing(session_iter(redis, match={"mail": email}))
+            )
+            async for key, created, session in sessions:
+                if key in seen:
+                    continue
+                if ses := await check(key, created, session):
+                    await index_add(redis, session["mail"], key)
+                    return ses
     msg = f"Session for {email}"
     if not scope:
         raise ValueError(f"{msg} not found")
-    raise ValueError(f"{msg} with scope {scope} not found ({cnt} checked)")
+    raise ValueError(f"{msg} with scope {scope} not found ({len(seen)} checked)")
+
+
+async def session_index_rebuild(
+    redis: Redis, /, *, batch_size: int = SCAN_BATCH
+) -> int:
+    """Add all sessions to the mail index. Returns the number of indexed sessions.
+
+    Run once for sessions created before the index, the index is maintained on
+    login, logout & session_clean.
+    """
+    cnt = 0
+    async for batch in scan_values(redis, batch_size=batch_size):
+        pipe = redis.pipeline(transaction=False)
+        for key, sval in batch:
+            try:
+                mail = decode_session(sval)["session"]["mail"]  # type: ignore[arg-type]
+            except Exception:
+                continue
+            if isinstance(mail, str) and mail:
+                pipe.sadd(mail_index_key(mail), key)
+                cnt += 1
+        await pipe.execute()
+    _LOG.info("Indexed %s sessions", cnt)
+    return cnt
 
 
 async def redis_get_json(key: str) -> list[Any] | dict[str, Any] | None:
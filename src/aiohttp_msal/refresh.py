@@ -0,0 +1,126 @@
+"""Background refresh of access tokens for active sessions."""
+
+import asyncio
+import logging
+import time
+from collections.abc import AsyncGenerator
+from contextlib import suppress
+from dataclasses import dataclass, field
+from typing import Any
+
+from aiohttp import web
+from aiohttp_session import Session
+from redis.asyncio import Redis
+from redis.exceptions import WatchError
+
+from aiohttp_msal.codec import decode_session, encode_session, session_ttl
+from aiohttp_msal.msal_async import TOKEN_EXPIRY_MARGIN, AsyncMSAL
+from aiohttp_msal.redis_tools import get_redis
+from aiohttp_msal.settings import ENV
+
+_LOG = logging.getLogger(__name__)
+
+
+@dataclass
+class TokenRefresher:
+    """Refresh the access tokens of active sessions before they expire.
+
+    Sessions are tracked when AsyncMSAL.async_get_token is called and should be
+    stored in Redis (app_init_redis_session). Only the refreshed token cache is
+    saved: with ENV.TOKEN_CACHE_REDIS its own key, otherwise the session, unless it
+    changed since it was read (e.g. logout).
+
+    app.cleanup_ctx.append(TokenRefresher().cleanup_ctx)
+    """
+
+    active: int = 15 * 60
+    """Refresh sessions used in the last `active` seconds."""
+    lead: int = 5 * 60
+    """Refresh tokens `lead` seconds before MSAL considers them expired."""
+    interval: int = 60
+    """Seconds between checks."""
+    sessions: dict[str, tuple[float, type[AsyncMSAL]]] = field(default_factory=dict)
+    """Redis key: (last used, AsyncMSAL class)."""
+
+    def touch(self, ses: AsyncMSAL) -> None:
+        """Track a session."""
+        if isinstance(ses.session, Session) and ses.session.identity:
+            key = f"{ENV.COOKIE_NAME}_{ses.session.identity}"
+            self.sessions[key] = (time.time(), type(ses))
+
+    async def refresh(self, redis: Redis) -> int:
+        """Refresh tokens expiring soon. Returns the number of refreshed tokens."""
+        cnt = 0
+        stale = time.time() - self.active
+        for key, (used, cls) in list(self.sessions.items()):
+            if used < stale:
+                del self.sessions[key]
+                continue
+            sval = await redis.get(key)
+            if sval is None:
+                del self.sessions[key]
+                continue
+            try:
+                val = decode_session(sval)
+                ses = cls(dict(val["session"]), redis=redis)
+                await ses.async_load_token_cache()
+                token = ses.get_cached_token()
+                if token and token["expires_in"] > TOKEN_EXPIRY_MARGIN + self.lead:
+                    continue
+                if not await ses.async_refresh_token(force_refresh=True):
+                    continue
+                cnt += 1
+                if ses.session != val["session"]:  # token cache in the session
+                    await _save_unchanged(
+                        redis, key, sval, int(val["created"]), dict(ses.session)
+                    )
+            except Exception as err:
+                _LOG.warning("Could not refresh the token for %s: %s", key, err)
+        if cnt:
+            _LOG.debug("Tokens refreshed: %s (%s active)", cnt, len(self.sessions))
+        return cnt
+
+    async def run(self) -> None:
+        """Refresh tokens every interval."""
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                async with get_redis() as redis:
+                    await self.refresh(redis)
+            except Exception:
+                _LOG.exception("Token refresh failed")
+
+    async def cleanup_ctx(self, _: web.Application) -> AsyncGenerator[None]:
+        """Run the refresher for the lifetime of the app."""
+        AsyncMSAL.token_refresher = self
+        task = asyncio.create_task(self.run())
+        try:
+            yield
+        finally:
+            task.cancel()
+            with suppress(asyncio.CancelledError):
+                await task
+            AsyncMSAL.token_refresher = None
+
+
+async def _save_unchanged(
+    redis: Redis, key: str, sval: bytes, created: int, session: dict[str, Any]
+) -> bool:
+    """Save a session, unless it changed in Redis since sval was read."""
+    async with redis.pipeline(transaction=True) as pipe:
+        await pipe.watch(key)
+        if await pipe.get(key) != sval:
+            _LOG.debug("Session %s changed, refreshed token not saved", key)
+            return False
+        pipe.multi()
+        pipe.set(
+            key,
+            encode_session({"created": created, "session": session}),
+            ex=session_ttl(created, ENV.SESSION_MAX_AGE),
+        )
+        try:
+            await pipe.execute()
+        except WatchError:
+            _LOG.debug("Session %s changed, refreshed token not saved", key)
+            return False
+    return True
@@ -9,8 +9,10 @@ from aiohttp import web
 from aiohttp_session import get_session, new_session
 
 from aiohttp_msal import ENV, auth_ok, msal_session
-from aiohttp_msal.helpers import get_manager_info, get_url, get_user_info, html_wrap
+from aiohttp_msal.cache import Photo, get_photo_cache
+from aiohttp_msal.helpers import get_url, get_user_and_manager_info, html_wrap
 from aiohttp_msal.msal_async import AsyncMSAL
+from aiohttp_msal.session_index import index_session
 
 ROUTES = web.RouteTableDef()
 
@@ -114,8 +116,7 @@ async def user_info(request: web.Request, ses: AsyncMSAL) -> web.Response:
     try:
         if debug:
             res["debug"] = True
-            await get_user_info(ses)
-            await get_manager_info(ses)
+            await get_user_and_manager_info(ses)
     except RuntimeError as err:
         res["get_user_info()"] = str(err)
     return web.json_response(res)
@@ -126,6 +127,9 @@ async def user_info(request: web.Request, ses: AsyncMSAL) -> web.Response:
 @msal_session(auth_ok)
 async def user_logout(request: web.Request, ses: AsyncMSAL) -> web.Response:
     """Redirect to MS graph login page."""
+    if ref := ses.session.get(ses.token_cache_ref_key):
+        await ENV.database.delete(ref)
+    await index_session(ses.session, remove=True)
     ses.session.clear()
 
     # post_logout_redirect_uri
@@ -141,29 +145,57 @@ async def user_logout(request: web.Request, ses: AsyncMSAL) -> web.Response:
     )  # redirect
 
 
+PHOTO_URL = "https://graph.microsoft.com/v1.0/me/photo/$value"
+PHOTO_CACHE_CONTROL = "private, max-age=3600"
+PHOTO_CHUNK = 64 * 1024
+
+
+def _not_modified(request: web.Request, etag: str) -> bool:
+    """If the browser's copy of the photo is current."""
+    tags = {
+        tag.strip().removeprefix("W/")
+        for tag in request.headers.get("If-None-Match", "").split(",")
+    }
+    return bool(etag) and ("*" in tags or etag.removeprefix("W/") in tags)
+
+
 @ROUTES.get("/user/photo")
 @msal_session(auth_ok)
 async def user_photo(request: web.Request, ses: AsyncMSAL) -> web.StreamResponse:
-    """Photo."""
-    async with ses.get("https://graph.microsoft.com/v1.0/me/photo/$value") as res:
-        response = web.StreamResponse(status=res.status)
-        for hdr in res.headers:
-            if hdr not in (
-                "Etag",
-                "request-id",
-                "client-request-id",
-                "x-ms-ags-diagnostic",
-                "Date",
-                "Cache-Control",
-            ):
-                response.headers[hdr] = res.headers[hdr]
-
-        response.headers["Cache-Control"] = "private, max-age: 3600"
-
+    """Photo. Cached per user (ENV.PHOTO_CACHE_BYTES) & revalidated with ETag."""
+    headers = {"Cache-Control": PHOTO_CACHE_CONTROL}
+    identity = ""
+    if cache := get_photo_cache():
+        await ses.async_load_token_cache()
+        if identity := ses.cache_identity():
+            if photo := await cache.get(identity):
+                headers["ETag"] = photo.etag
+                if _not_modified(request, photo.etag):
+                    return web.Response(status=304, headers=headers)
+                return web.Response(
+                    body=photo.body, content_type=photo.content_type, headers=headers
+                )
+
+    async with ses.get(PHOTO_URL) as res:
+        if res.status != web.HTTPOk.status_code:
+            return web.Response(status=res.status)
+        if etag := res.headers.get("ETag", ""):
+            headers["ETag"] = etag
+            if _not_modified(request, etag):
+                return web.Response(status=304, headers=headers)
+        content_type = res.headers.get("Content-Type", "image/jpeg")
+        response = web.StreamResponse(headers=headers)
+        response.content_type = content_type
+        if res.content_length:
+            response.content_length = res.content_length
         await response.prepare(request)
 
-        async for chunk in res.content.iter_chunked(1024):
+        body = bytearray()
+        async for chunk in res.content.iter_chunked(PHOTO_CHUNK):
             await response.write(chunk)
+            if cache and identity:
+                body.extend(chunk)
 
-        # await response.write_eof()
-        return response
+    if cache and identity:
+        await cache.set(identity, Photo(bytes(body), content_type, etag))
+    return response
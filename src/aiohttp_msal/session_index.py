@@ -0,0 +1,88 @@
+"""Index of Redis session keys by mail, for lookups without a full scan."""
+
+import logging
+from typing import Any
+
+from aiohttp_session import Session
+from redis.asyncio import Redis, RedisCluster
+
+from aiohttp_msal.codec import decode_session
+from aiohttp_msal.settings import ENV
+
+_LOG = logging.getLogger(__name__)
+
+MAIL_INDEX_PREFIX = "msal_mail_"
+"""Redis set per mail with session keys. Does not match ENV.COOKIE_NAME scans."""
+
+
+def mail_index_key(mail: str) -> str:
+    """Get the index key of a mail address."""
+    return MAIL_INDEX_PREFIX + mail.strip().lower()
+
+
+def session_key(session: Session | dict[str, Any]) -> str:
+    """Get the Redis key of a web session. Empty if the session was not saved yet."""
+    if isinstance(session, Session) and session.identity:
+        return f"{ENV.COOKIE_NAME}_{session.identity}"
+    return ""
+
+
+async def mget(redis: Redis, keys: list[str]) -> list[bytes | None]:
+    """Get the values of keys. Split by hash slot on a Redis Cluster."""
+    if isinstance(redis, RedisCluster):
+        return await redis.mget_nonatomic(keys)  # type: ignore[no-any-return]
+    return await redis.mget(keys)  # type: ignore[no-any-return]
+
+
+async def index_add(redis: Redis, mail: str, *keys: str) -> None:
+    """Add session keys to the index of mail."""
+    if mail and keys:
+        await redis.sadd(mail_index_key(mail), *keys)  # type: ignore[misc]
+
+
+async def index_remove(redis: Redis, mail: str, *keys: str) -> None:
+    """Remove session keys from the index of mail."""
+    if mail and keys:
+        await redis.srem(mail_index_key(mail), *keys)  # type: ignore[misc]
+
+
+async def index_session(
+    session: Session | dict[str, Any], remove: bool = False
+) -> None:
+    """Add (or remove) a web session to the index of its mail, if stored in Redis."""
+    if not (ENV.database and (key := session_key(session))):
+        return
+    mail = session.get("mail", "")
+    if remove:
+        await index_remove(ENV.database, mail, key)
+    else:
+        await index_add(ENV.database, mail, key)
+
+
+async def index_sessions(
+    redis: Redis, mail: str
+) -> list[tuple[str, int, dict[str, Any]]]:
+    """Get the sessions of mail from the index, as (key, created, session).
+
+    Stale entries, of sessions that no longer exist or changed mail, are removed.
+    """
+    keys = sorted(
+        k if isinstance(k, str) else k.decode()
+        for k in await redis.smembers(mail_index_key(mail))  # type: ignore[misc]
+    )
+    if not keys:
+        return []
+    res, stale = [], []
+    for key, sval in zip(keys, await mget(redis, keys), strict=True):
+        try:
+            val = decode_session(sval)  # type: ignore[arg-type]
+            ses = val["session"]
+            if ses["mail"].strip().lower() != mail.strip().lower():
+                raise KeyError("mail")
+            res.append((key, int(val["created"]), ses))
+        except Exception:
+            stale.append(key)
+    if stale:
+        _LOG.debug("Removing stale index entries for %s: %s", mail, stale)
+        await index_remove(redis, mail, *stale)
+    return res
@@ -2,6 +2,7 @@
 
 import json
 from collections.abc import Awaitable, Callable
+from contextlib import suppress
 from dataclasses import dataclass, field
 from typing import TYPE_CHECKING, Any
 
@@ -10,9 +11,45 @@ from aiohttp_msal.settings_base import VAR_HIDE, VAR_REQ, VAR_REQ_HIDE, Settings
 if TYPE_CHECKING:
     from redis.asyncio import Redis
 
+try:
+    import orjson
+except ImportError:
+    orjson = None  # type: ignore[assignment]
+
 __all__ = ["ENV", "VAR_HIDE", "VAR_REQ", "VAR_REQ_HIDE", "MSALSettings", "SettingsBase"]
 
 
+def json_dumps(obj: Any) -> str:
+    """Serialize to JSON, using orjson if installed.
+
+    Falls back to json for objects orjson does not support, e.g. big integers.
+    """
+    if orjson:
+        with suppress(TypeError):
+            return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS).decode()
+    return json.dumps(obj)
+
+
+def json_dumpb(obj: Any) -> bytes:
+    """Serialize to JSON bytes, using orjson if installed.
+
+    Uses ENV.json_dumps if it was replaced, e.g. with a custom encoder.
+    """
+    if ENV.json_dumps is not json_dumps:
+        return ENV.json_dumps(obj).encode()
+    if orjson:
+        with suppress(TypeError):
+            return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj).encode()
+
+
+def json_loads(data: str | bytes | bytearray) -> Any:
+    """Deserialize JSON from str or bytes, using orjson if installed."""
+    if orjson:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
 @dataclass
 class MSALSettings(SettingsBase):
     """Settings."""
@@ -40,12 +77,80 @@ class MSALSettings(SettingsBase):
     """List of attributes to return in /user/info."""
 
     REDIS: str = "redis://redis1:6379"
-    """OPTIONAL: Redis database connection used by app_init_redis_session()."""
+    """OPTIONAL: Redis connection used by app_init_redis_session().
+
+    Also redis+cluster://host:port & redis+sentinel://host:port[,host:port]/service
+    """
+    SESSION_MAX_AGE: int = 3600 * 24 * 90
+    """Seconds a session is valid, also used as the Redis TTL from its creation."""
+    SESSION_COMPRESSION: str = ""
+    """OPTIONAL: Compress Redis sessions, "zlib" or "zstd" (Python 3.14+)."""
+    SESSION_COMPRESS_MIN: int = 1024
+    """Only compress sessions larger than this (bytes)."""
+    TOKEN_CACHE_REDIS: bool = False
+    """OPTIONAL: Store the token cache in its own Redis key, not in the session."""
+    RESPONSE_CACHE: int = 0
+    """Max GET responses cached in memory by AsyncMSAL.cached_get. 0 to disable."""
+    RESPONSE_CACHE_TTL: int = 3600
+    """Seconds to keep cached responses. 0 to keep them until evicted."""
+    RESPONSE_CACHE_REDIS: bool = False
+    """OPTIONAL: Also cache responses in Redis, shared by all instances."""
+    PHOTO_CACHE_BYTES: int = 16 * 1024 * 1024
+    """Memory used to cache user photos for /user/photo. 0 to disable."""
+    PHOTO_CACHE_TTL: int = 3600
+    """Seconds to cache user photos."""
+    PHOTO_CACHE_REDIS: bool = False
+    """OPTIONAL: Also cache user photos in Redis, shared by all instances."""
+    PROFILE_CACHE: int = 10000
+    """Max user profiles (mail, name & manager) cached in memory. 0 to disable."""
+    PROFILE_CACHE_TTL: int = 3600
+    """Seconds to cache user profiles, Graph is consulted on expiry."""
+    PROFILE_CACHE_REDIS: bool = True
+    """Also cache user profiles in Redis (ENV.database), shared by all instances."""
     database: "Redis" = None  # type: ignore[assignment]
     """Store the Redis connection when using app_init_redis_session()."""
 
-    json_dumps: Callable[[Any], str] = field(default=json.dumps)
-    json_loads: Callable[[str | bytes | bytearray], Any] = field(default=json.loads)
+    HTTP_LIMIT: int = 200
+    """Max connections of the shared ClientSession. 0 for no limit."""
+    HTTP_LIMIT_PER_HOST: int = 100
+    """Max connections per host. 0 for no limit."""
+    HTTP_KEEPALIVE: int = 30
+    """Seconds to keep idle connections open."""
+    HTTP_DNS_TTL: int = 300
+    """Seconds to cache DNS lookups. 0 to disable the DNS cache."""
+    HTTP_TIMEOUT: int = 60
+    """Total request timeout in seconds. 0 for no timeout."""
+    HTTP_CONNECT_TIMEOUT: int = 10
+    """Connect timeout in seconds. 0 for no timeout."""
+    HTTP_WARMUP: str = "https://graph.microsoft.com/"
+    """Comma separated URLs to connect to on startup."""
+    HTTP_HOST_CONCURRENCY: int = 0
+    """Max AsyncMSAL requests in flight per host. 0 for no limit."""
+    HTTP_HOST_RATE: int = 0
+    """Max AsyncMSAL requests per second per host. 0 for no limit."""
+    HTTP_HOST_BURST: int = 0
+    """Requests allowed in a burst above HTTP_HOST_RATE. 0 for HTTP_HOST_RATE."""
+    HTTP_QUEUE_DEADLINE: int = 0
+    """Reject requests with a 503 if they would wait longer (seconds). 0 to wait."""
+    HTTP_LIMIT_BY_APP: bool = False
+    """Limit requests per host & client_id, not only per host."""
+    BREAKER_FAILURES: int = 5
+    """Consecutive failures before requests to a host fail fast. 0 to disable."""
+    BREAKER_COOLDOWN: int = 30
+    """Seconds to fail fast before a trial request is allowed."""
+
+    EXECUTOR_WORKERS: int = 8
+    """Threads for blocking MSAL calls (token acquisition)."""
+    EXECUTOR_QUEUE: int = 200
+    """Max MSAL calls waiting for a thread, more are rejected with a 503. 0 for no limit."""
+
+    json_dumps: Callable[[Any], str] = field(default=json_dumps)
+    json_dumpb: Callable[[Any], bytes] = field(default=json_dumpb)
+    """Serialize to JSON bytes. Used for Redis sessions & request bodies.
+
+    Defaults to json_dumps encoded as UTF-8 when only json_dumps is replaced.
+    """
+    json_loads: Callable[[str | bytes | bytearray], Any] = field(default=json_loads)
 
 
 ENV = MSALSettings("MSAL")
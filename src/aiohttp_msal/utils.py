@@ -1,22 +1,33 @@
 """Graph User Info."""
 
 import asyncio
-from collections.abc import Callable, Coroutine
+import logging
+import random
+import time
+from collections.abc import Awaitable, Callable, Coroutine, Mapping
+from dataclasses import dataclass, field
+from email.utils import parsedate_to_datetime
 from functools import wraps
 from typing import Any
 
+from aiohttp import ClientConnectionError, ClientResponse, ClientResponseError, web
+
+from aiohttp_msal.executor import run_in_executor
+
+_LOG = logging.getLogger(__name__)
+
 
 def async_wrap[T, **P](
     func: Callable[P, T],
 ) -> Callable[P, Coroutine[None, None, T]]:
-    """Wrap a function doing I/O to run in an executor thread."""
+    """Wrap a function doing I/O to run in the MSAL executor."""
 
     @wraps(func)
     async def run(
         *args: Any,
         **kwargs: Any,
     ) -> T:
-        return await asyncio.to_thread(func, *args, **kwargs)
+        return await run_in_executor(func, *args, **kwargs)
 
     return run
 
@@ -41,23 +52,164 @@ class dict_property(property):
             getattr(instance, self.dict_name, {}).__setitem__(self.prop_name, value)
 
 
-def retry[T, **P](
-    func: Callable[P, Coroutine[None, None, T]],
-) -> Callable[P, Coroutine[None, None, T]]:
-    """Retry if tenacity is installed."""
+RETRY_STATUS = frozenset({408, 429, 500, 502, 503, 504})
+"""HTTP status codes that are retried."""
+RETRY_UNSAFE_STATUS = frozenset({429, 503})
+"""Statuses retried for non-idempotent requests, the request was not processed."""
 
-    @wraps(func)
-    async def _retry(*args: P.args, **kwargs: P.kwargs) -> T:
-        """Retry the request."""
-        retries = [2, 4, 8]
+
+def parse_retry_after(value: str | None) -> float | None:
+    """Parse a Retry-After header, either seconds or an HTTP date."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, when.timestamp() - time.time())
+
+
+@dataclass
+class RetryPolicy:
+    """Retry with exponential backoff & full jitter, honoring Retry-After.
+
+    Can be used as a decorator for coroutine functions, or with send() for
+    HTTP requests. Retries are limited per call (attempts & max_wait) and by a
+    global budget: every call adds budget_ratio tokens (up to budget_max) and
+    every retry takes one, so a failing backend is not flooded with retries.
+    """
+
+    attempts: int = 3
+    """Max retries per call."""
+    base: float = 0.5
+    cap: float = 8.0
+    """Max backoff delay in seconds."""
+    max_wait: float = 30.0
+    """Max total seconds a call sleeps, including Retry-After."""
+    statuses: frozenset[int] = RETRY_STATUS
+    exceptions: tuple[type[BaseException], ...] = (
+        ClientConnectionError,
+        ConnectionError,
+        TimeoutError,
+    )
+    """Exceptions that are retried."""
+    budget_ratio: float = 0.2
+    budget_max: float = 10.0
+    tokens: float = field(default=-1.0, repr=False)
+
+    def __post_init__(self) -> None:
+        """Start with a full budget."""
+        if self.tokens < 0:
+            self.tokens = self.budget_max
+
+    def __call__[T, **P](
+        self, func: Callable[P, Coroutine[None, None, T]]
+    ) -> Callable[P, Coroutine[None, None, T]]:
+        """Retry decorator."""
+
+        @wraps(func)
+        async def _retry(*args: P.args, **kwargs: P.kwargs) -> T:
+            """Retry the request."""
+            return await self.call(func, *args, **kwargs)
+
+        return _retry
+
+    def backoff(self, attempt: int) -> float:
+        """Delay before retry attempt (0-based), with full jitter."""
+        return random.uniform(0, min(self.cap, self.base * 2**attempt))
+
+    def delay(
+        self, attempt: int, waited: float, retry_after: float | None = None
+    ) -> float | None:
+        """Get the delay before the next retry, or None if it should not retry.
+
+        Takes a token from the global budget when retrying.
+        """
+        if attempt >= self.attempts:
+            return None
+        delay = self.backoff(attempt) if retry_after is None else retry_after
+        if waited + delay > self.max_wait:
+            _LOG.debug("Not retrying, wait %.1fs exceeds max_wait", waited + delay)
+            return None
+        if self.tokens < 1:
+            _LOG.warning("Retry budget exhausted")
+            return None
+        self.tokens -= 1
+        return delay
+
+    def classify(self, err: BaseException) -> tuple[bool, float | None]:
+        """If an exception should be retried & its Retry-After."""
+        if isinstance(err, (ClientResponseError, web.HTTPException)):
+            headers: Mapping[str, str] = err.headers or {}
+            return err.status in self.statuses, parse_retry_after(
+                headers.get("Retry-After")
+            )
+        return isinstance(err, self.exceptions), None
+
+    def _deposit(self) -> None:
+        self.tokens = min(self.budget_max, self.tokens + self.budget_ratio)
+
+    async def call[T, **P](
+        self,
+        func: Callable[P, Coroutine[None, None, T]],
+        *args: P.args,
+        **kwargs: P.kwargs,
+    ) -> T:
+        """Call func, retrying retryable exceptions."""
+        self._deposit()
+        attempt, waited = 0, 0.0
         while True:
             try:
-                res = await func(*args, **kwargs)
-                return res
+                return await func(*args, **kwargs)
             except Exception as err:
-                if retries:
-                    await asyncio.sleep(retries.pop())
-                else:
-                    raise err
+                retryable, retry_after = self.classify(err)
+                if not retryable:
+                    raise
+                if (delay := self.delay(attempt, waited, retry_after)) is None:
+                    raise
+                _LOG.debug("Retry %s in %.2fs: %s", func.__name__, delay, err)
+            attempt += 1
+            waited += delay
+            await asyncio.sleep(delay)
+
+    async def send(
+        self,
+        send: Callable[[], Awaitable[ClientResponse]],
+        *,
+        idempotent: bool = True,
+    ) -> ClientResponse:
+        """Send an HTTP request, retrying retryable statuses & connection errors.
+
+        Non-idempotent requests are only retried on RETRY_UNSAFE_STATUS. Returns
+        the last response if it should not be retried.
+        """
+        self._deposit()
+        attempt, waited = 0, 0.0
+        while True:
+            try:
+                res = await send()
+            except self.exceptions as err:
+                if not idempotent or (delay := self.delay(attempt, waited)) is None:
+                    raise
+                _LOG.debug("Retry request in %.2fs: %s", delay, err)
+            else:
+                if res.status not in self.statuses or not (
+                    idempotent or res.status in RETRY_UNSAFE_STATUS
+                ):
+                    return res
+                retry_after = parse_retry_after(res.headers.get("Retry-After"))
+                if (delay := self.delay(attempt, waited, retry_after)) is None:
+                    return res
+                _LOG.debug("Retry %s %s in %.2fs", res.status, res.url, delay)
+                res.release()
+            attempt += 1
+            waited += delay
+            await asyncio.sleep(delay)
+
 
-    return _retry
+retry = RetryPolicy()
+"""Default retry policy, used as @retry decorator & by AsyncMSAL.request."""
@@ -0,0 +1,68 @@
+"""Test fixtures."""
+
+import base64
+import json
+import time
+from collections.abc import Iterator
+from typing import Any
+from unittest.mock import patch
+
+import pytest
+from msal import SerializableTokenCache
+
+from aiohttp_msal.msal_async import AsyncMSAL
+from aiohttp_msal.settings import ENV
+
+AUTHORITY = "https://login.microsoftonline.com/tid"
+OPENID_CONFIG = {
+    "authorization_endpoint": f"{AUTHORITY}/oauth2/v2.0/authorize",
+    "token_endpoint": f"{AUTHORITY}/oauth2/v2.0/token",
+    "issuer": f"{AUTHORITY}/v2.0",
+}
+
+
+def _b64(data: dict[str, Any]) -> str:
+    return base64.urlsafe_b64encode(json.dumps(data).encode()).decode().rstrip("=")
+
+
+def make_token_cache(
+    uid: str = "uid", access_token: str = "at", expires_in: int = 3600
+) -> str:
+    """Return a serialized token cache for a user."""
+    now = int(time.time())
+    claims = {
+        "aud": "cid",
+        "iss": OPENID_CONFIG["issuer"],
+        "oid": uid,
+        "tid": "tid",
+        "preferred_username": f"{uid}@k",
+        "iat": now,
+        "exp": now + 3600,
+    }
+    cache = SerializableTokenCache()
+    cache.add(
+        {
+            "client_id": "cid",
+            "scope": AsyncMSAL.default_scopes,
+            "token_endpoint": OPENID_CONFIG["token_endpoint"],
+            "response": {
+                "access_token": access_token,
+                "refresh_token": f"rt-{uid}",
+                "expires_in": expires_in,
+                "token_type": "Bearer",
+                "client_info": _b64({"uid": uid, "utid": "tid"}),
+                "id_token": f"x.{_b64(claims)}.x",
+            },
+        }
+    )
+    return cache.serialize()
+
+
+@pytest.fixture
+def msal_env(monkeypatch: pytest.MonkeyPatch) -> Iterator[None]:
+    """Configure the app settings & patch out tenant discovery."""
+    monkeypatch.setattr(ENV, "SP_APP_ID", "cid")
+    monkeypatch.setattr(ENV, "SP_APP_PW", "pw")
+    monkeypatch.setattr(ENV, "SP_AUTHORITY", AUTHORITY)
+    with patch("msal.authority.tenant_discovery", return_value=OPENID_CONFIG):
+        yield
@@ -0,0 +1,114 @@
+"""Test the circuit breaker."""
+
+from unittest.mock import AsyncMock, MagicMock, Mock, patch
+
+import pytest
+from aiohttp import web
+
+from aiohttp_msal import breaker, msal_async
+from aiohttp_msal.breaker import CircuitBreaker, State, breaker_status, get_breaker
+from aiohttp_msal.msal_async import AsyncMSAL
+from aiohttp_msal.settings import ENV
+
+
+def test_breaker_states() -> None:
+    """Closed -> open -> half open -> closed/open."""
+    brk = CircuitBreaker("graph", threshold=2, cooldown=10)
+    brk.allow()
+    brk.failure()
+    assert brk.state is State.CLOSED
+    brk.failure()
+    assert brk.state is State.OPEN
+
+    with pytest.raises(web.HTTPServiceUnavailable) as err:
+        brk.allow()
+    assert err.value.headers["Retry-After"] == "10"
+
+    brk.opened_at -= 10  # cooldown passed
+    brk.allow()
+    assert brk.state is State.HALF_OPEN
+    with pytest.raises(web.HTTPServiceUnavailable):
+        brk.allow()  # only a single trial call
+    brk.failure()
+    assert brk.state is State.OPEN
+
+    brk.opened_at -= 10
+    with brk.guard():
+        pass
+    assert brk.state is State.CLOSED
+    assert brk.status() == {
+        "state": "closed",
+        "failures": 0,
+        "opened": 2,
+        "rejected": 2,
+    }
+
+
+def test_breaker_guard() -> None:
+    """Exceptions are recorded as failures."""
+    brk = CircuitBreaker("login", threshold=1)
+    with pytest.raises(ConnectionError), brk.guard():
+        raise ConnectionError
+    assert brk.state is State.OPEN
+
+
+async def test_request_breaker(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Requests fail fast when the circuit is open."""
+    monkeypatch.setattr(breaker, "_BREAKERS", {})
+    monkeypatch.setattr(ENV, "BREAKER_FAILURES", 2)
+    ses = AsyncMSAL({})
+    cses = Mock(request=AsyncMock(return_value=Mock(status=500)))
+    with (
+        patch.object(AsyncMSAL, "client_session", cses),
+        patch.object(AsyncMSAL, "retry_policy", None),
+        patch.object(
+            ses, "async_get_token", AsyncMock(return_value={"access_token": "t"})
+        ),
+    ):
+        for _ in range(2):
+            assert (await ses.request("get", "https://graph/me")).status == 500
+        with pytest.raises(web.HTTPServiceUnavailable):
+            await ses.request("get", "https://graph/me")
+    assert cses.request.call_count == 2
+    assert breaker_status()["graph"]["state"] == "open"
+    assert get_breaker("other") is not get_breaker("graph")
+
+
+def test_breaker_call() -> None:
+    """Results where failed(result) are recorded as failures."""
+    brk = CircuitBreaker("login", threshold=2)
+    failed = lambda res: res.get("error") == "server_error"  # noqa: E731
+    assert brk.call(dict, error="invalid_grant", failed=failed)
+    assert brk.failures == 0
+    for _ in range(2):
+        brk.call(dict, error="server_error", failed=failed)
+    assert brk.state is State.OPEN
+
+
+async def test_request_breaker_limiter(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Limiter rejections are not recorded as failures of the host."""
+    monkeypatch.setattr(breaker, "_BREAKERS", {})
+    monkeypatch.setattr(ENV, "BREAKER_FAILURES", 1)
+    limiter = MagicMock()
+    limiter.acquire.return_value.__aenter__.side_effect = web.HTTPServiceUnavailable
+    ses = AsyncMSAL({})
+    with (
+        patch.object(msal_async, "get_limiter", Mock(return_value=limiter)),
+        patch.object(AsyncMSAL, "client_session", Mock()),
+        patch.object(AsyncMSAL, "retry_policy", None),
+        patch.object(
+            ses, "async_get_token", AsyncMock(return_value={"access_token": "t"})
+        ),
+    ):
+        for _ in range(2):
+            with pytest.raises(web.HTTPServiceUnavailable):
+                await ses.request("get", "https://graph/me")
+    assert breaker_status()["graph"]["failures"] == 0
+
+
+def test_token_server_error() -> None:
+    """Token endpoint errors."""
+    assert msal_async.token_server_error({"error": "temporarily_unavailable"})
+    assert not msal_async.token_server_error({"error": "invalid_grant"})
+    assert not msal_async.token_server_error({"access_token": "t"})
+    assert not msal_async.token_server_error(None)
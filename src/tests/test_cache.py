@@ -0,0 +1,103 @@
+"""Test the caches."""
+
+import time
+from typing import Any
+from unittest.mock import AsyncMock, MagicMock, Mock
+
+import pytest
+
+from aiohttp_msal import cache
+from aiohttp_msal.cache import CachedResponse, LRUCache, parse_cache_control
+from aiohttp_msal.msal_async import AsyncMSAL
+from aiohttp_msal.settings import ENV
+from tests.conftest import make_token_cache
+
+
+def test_lru_cache() -> None:
+    """Entries are evicted by count, size & age."""
+    lru = LRUCache[int](max_entries=2, max_bytes=10)
+    lru.set("a", 1, size=4)
+    lru.set("b", 2, size=4)
+    assert lru.get("a") == 1
+    lru.set("c", 3, size=4)  # evicts b, the least recently used
+    assert lru.get("b") is None
+    assert lru.bytes == 8
+    lru.set("d", 4, size=11)  # too large
+    assert lru.get("d") is None
+    assert len(lru) == 2
+    assert lru.stats.asdict() == {
+        "hits": 1,
+        "misses": 2,
+        "revalidated": 0,
+        "evictions": 1,
+    }
+
+    lru = LRUCache[int](ttl=10)
+    lru.set("a", 1)
+    lru._data["a"] = (time.monotonic() - 11, 0, 1)
+    assert lru.get("a") is None
+    assert len(lru) == 0
+
+
+def test_cached_response() -> None:
+    """Freshness, validators & serialization."""
+    assert parse_cache_control('private, max-age=60, no-cache="x"') == {
+        "private": "",
+        "max-age": "60",
+        "no-cache": "x",
+    }
+    res = CachedResponse("u", 200, b"{}", {"Cache-Control": "max-age=60"})
+    assert res.fresh and res.storable and res.json() == {}
+    res.stored -= 61
+    assert not res.fresh
+
+    res = CachedResponse("u", 200, b"\xff", {"ETag": '"1"', "Last-Modified": "x"})
+    assert not res.fresh and res.storable
+    assert res.validators() == {"If-None-Match": '"1"', "If-Modified-Since": "x"}
+    assert CachedResponse.loadb(res.dumpb()) == res
+
+    assert not CachedResponse("u", 200, b"", {"Cache-Control": "no-store"}).storable
+    assert not CachedResponse("u", 200, b"").storable
+    assert not CachedResponse("u", 404, b"", {"ETag": "1"}).storable
+
+
+def mock_get(ses: AsyncMSAL, responses: list[tuple[int, dict[str, str]]]) -> Mock:
+    """Mock GET responses, returns the mock called with the request headers."""
+    sent = Mock()
+
+    def get(url: str, headers: dict[str, str]) -> MagicMock:
+        sent(headers)
+        status, hdrs = responses.pop(0)
+        res = MagicMock(status=status, headers=hdrs, url=url)
+        res.read = AsyncMock(return_value=f'{{"n":{len(responses)}}}'.encode())
+        ctx = MagicMock()
+        ctx.__aenter__.return_value = res
+        return ctx
+
+    ses.get = get  # type: ignore[method-assign,assignment]
+    return sent
+
+
+async def test_cached_get(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Responses are revalidated & isolated per user."""
+    monkeypatch.setattr(ENV, "RESPONSE_CACHE", 10)
+    monkeypatch.setattr(cache, "_RESPONSE_CACHE", None)
+    ses1 = AsyncMSAL({"token_cache": make_token_cache("u1")})
+    sent = mock_get(ses1, [(200, {"ETag": '"a"'}), (304, {})])
+    res = await ses1.cached_get("https://graph/me", params={"$select": "id"})
+    assert res.json() == {"n": 1}
+    res = await ses1.cached_get("https://graph/me", params={"$select": "id"})
+    assert res.json() == {"n": 1}
+    assert sent.call_args_list[1].args[0] == {"If-None-Match": '"a"'}
+
+    # Another user does not get the cached response
+    ses2 = AsyncMSAL({"token_cache": make_token_cache("u2")})
+    sent = mock_get(ses2, [(200, {"Cache-Control": "max-age=60"})])
+    assert (await ses2.cached_get("https://graph/me?%24select=id")).json() == {"n": 0}
+    sent.assert_called_once_with({})
+    # Fresh, no request
+    assert (await ses2.cached_get("https://graph/me?%24select=id")).json() == {"n": 0}
+
+    stats: dict[str, Any] = cache._RESPONSE_CACHE.memory.stats.asdict()  # type: ignore[union-attr]
+    assert stats["hits"] == 2
+    assert stats["revalidated"] == 1
@@ -0,0 +1,57 @@
+"""Test the shared ClientSession."""
+
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from aiohttp_msal import client_session_ctx
+from aiohttp_msal.client import client_session_stats, create_client_session
+from aiohttp_msal.msal_async import AsyncMSAL
+from aiohttp_msal.settings import ENV
+
+
+async def test_create_client_session(monkeypatch: pytest.MonkeyPatch) -> None:
+    """The connector & timeouts follow the settings."""
+    monkeypatch.setattr(ENV, "HTTP_LIMIT_PER_HOST", 7)
+    monkeypatch.setattr(ENV, "HTTP_TIMEOUT", 0)
+    cses = create_client_session()
+    assert cses.timeout.total is None
+    assert cses.timeout.connect == ENV.HTTP_CONNECT_TIMEOUT
+    stats = client_session_stats(cses)
+    assert stats["limit_per_host"] == 7
+    assert stats["acquired"] == stats["idle"] == stats["waiting"] == 0
+    await cses.close()
+    assert client_session_stats(cses) == {}
+    assert client_session_stats(None) == {}
+
+
+async def test_client_session_ctx(
+    monkeypatch: pytest.MonkeyPatch,
+    aiohttp_server: Callable[[web.Application], Awaitable[TestServer]],
+) -> None:
+    """The session is warmed on startup & closed on cleanup."""
+    hits = list[Any]()
+
+    async def handler(request: web.Request) -> web.Response:
+        hits.append(request.method)
+        return web.Response()
+
+    app = web.Application()
+    app.router.add_route("*", "/", handler)
+    server = await aiohttp_server(app)
+    monkeypatch.setattr(
+        ENV, "HTTP_WARMUP", f"{server.make_url('/')}, http://0.0.0.0:1/"
+    )
+
+    ctx = client_session_ctx(web.Application())
+    await anext(ctx)
+    cses = AsyncMSAL.client_session
+    assert cses is not None
+    assert hits == ["HEAD"]
+
+    await ctx.aclose()
+    assert AsyncMSAL.client_session is None
+    assert cses.closed
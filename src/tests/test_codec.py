@@ -0,0 +1,120 @@
+"""Test the session codec."""
+
+import json
+import time
+from unittest.mock import AsyncMock, Mock
+
+import pytest
+from aiohttp import web
+from aiohttp_session import Session
+from redis.asyncio import Redis, RedisCluster
+
+from aiohttp_msal import app_init_redis_session
+from aiohttp_msal.codec import (
+    FORMATS,
+    MAGIC,
+    RedisStorage,
+    decode_session,
+    encode_session,
+    session_ttl,
+)
+from aiohttp_msal.settings import ENV
+
+DATA = {"created": 1, "session": {"mail": "j@k", "token_cache": "x" * 2000}}
+
+
+@pytest.mark.parametrize("compression", ["", *FORMATS])
+def test_codec(monkeypatch: pytest.MonkeyPatch, compression: str) -> None:
+    """Sessions are compressed above the threshold & plain JSON is readable."""
+    monkeypatch.setattr(ENV, "SESSION_COMPRESSION", compression)
+
+    enc = encode_session(DATA)
+    assert decode_session(enc) == DATA
+    if compression:
+        assert isinstance(enc, bytes)
+        assert enc.startswith(MAGIC)
+        assert len(enc) < 1000
+    else:
+        assert enc == ENV.json_dumpb(DATA)
+
+    small = {"created": 1, "session": {}}
+    assert encode_session(small) == ENV.json_dumpb(small)
+
+    # Existing sessions
+    assert decode_session(json.dumps(DATA)) == DATA
+    assert decode_session(json.dumps(DATA).encode()) == DATA
+
+
+def test_codec_invalid(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Unknown formats raise ValueError."""
+    with pytest.raises(ValueError):
+        decode_session(MAGIC + b"\x02\x01abc")
+    with pytest.raises(ValueError):
+        decode_session(MAGIC + b"\x01\x01abc")
+    monkeypatch.setattr(ENV, "SESSION_COMPRESSION", "lzma")
+    with pytest.raises(ValueError):
+        encode_session(DATA)
+
+
+async def test_storage_load(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Binary sessions are loaded by RedisStorage."""
+    monkeypatch.setattr(ENV, "SESSION_COMPRESSION", "zlib")
+    redis = Mock(spec=Redis)
+    redis.get = AsyncMock(return_value=encode_session(DATA))
+    storage = RedisStorage(redis, encoder=encode_session, decoder=decode_session)  # type: ignore[arg-type]
+
+    request = Mock()
+    request.cookies = {storage.cookie_name: "abc"}
+    ses = await storage.load_session(request)
+    assert ses.identity == "abc"
+    assert ses["mail"] == "j@k"
+    redis.get.assert_awaited_once_with(f"{storage.cookie_name}_abc")
+
+
+async def test_storage_save_ttl() -> None:
+    """Sessions expire max_age after their creation."""
+    redis = Mock(spec=Redis)
+    redis.set = AsyncMock()
+    storage = RedisStorage(redis, max_age=100, encoder=encode_session)  # type: ignore[arg-type]
+    ses = Session(
+        "abc",
+        data={"created": int(time.time()) - 40, "session": {"mail": "j@k"}},
+        new=False,
+        max_age=100,
+    )
+    ses.changed()
+    await storage.save_session(Mock(), Mock(), ses)
+    assert redis.set.await_args.args[0] == f"{storage.cookie_name}_abc"  # type: ignore[union-attr]
+    assert 58 <= redis.set.await_args.kwargs["ex"] <= 60  # type: ignore[union-attr]
+    assert session_ttl(0, 100) == 1
+
+
+async def test_storage_cluster(monkeypatch: pytest.MonkeyPatch) -> None:
+    """A Redis Cluster URL can be used for the session storage."""
+    monkeypatch.setattr(ENV, "REDIS", "redis+cluster://127.0.0.1:7000")
+    monkeypatch.setattr(ENV, "database", None)
+    app = web.Application()
+    await app_init_redis_session(app, check_proxy_cb=AsyncMock())
+    assert isinstance(ENV.database, RedisCluster)
+
+    with pytest.raises(TypeError):
+        RedisStorage(Mock())  # type: ignore[arg-type]
+
+
+async def test_init_compression(monkeypatch: pytest.MonkeyPatch) -> None:
+    """An unsupported SESSION_COMPRESSION fails at startup."""
+    monkeypatch.setattr(ENV, "SESSION_COMPRESSION", "lzma")
+    check_proxy = AsyncMock()
+    with pytest.raises(ValueError, match="lzma"):
+        await app_init_redis_session(web.Application(), check_proxy_cb=check_proxy)
+    check_proxy.assert_not_awaited()
+
+
+async def test_init_max_age(monkeypatch: pytest.MonkeyPatch) -> None:
+    """max_age is used for all session TTLs."""
+    monkeypatch.setattr(ENV, "SESSION_MAX_AGE", ENV.SESSION_MAX_AGE)
+    monkeypatch.setattr(ENV, "database", Mock(spec=Redis))
+    await app_init_redis_session(
+        web.Application(), max_age=100, check_proxy_cb=AsyncMock()
+    )
+    assert ENV.SESSION_MAX_AGE == 100
@@ -0,0 +1,78 @@
+"""Test the MSAL executor."""
+
+import asyncio
+import threading
+
+import pytest
+from aiohttp import web
+
+from aiohttp_msal.executor import MSALExecutor, get_executor, shutdown_executor
+
+
+async def test_executor_stats() -> None:
+    """Test counters & the wait time histogram."""
+    exe = MSALExecutor(2)
+    res = await asyncio.gather(*(exe.run(pow, i, 2) for i in range(5)))
+    assert res == [0, 1, 4, 9, 16]
+
+    stats = exe.stats.asdict()
+    assert stats["completed"] == 5
+    assert stats["queued"] == stats["running"] == stats["rejected"] == 0
+    assert sum(stats["wait_time"].values()) == 5
+    exe.shutdown()
+
+
+async def test_executor_reject() -> None:
+    """Calls are rejected with a 503 when the queue is full."""
+    exe = MSALExecutor(1, max_queue=1)
+    release = threading.Event()
+
+    blocked = asyncio.ensure_future(exe.run(release.wait))
+    await asyncio.sleep(0.05)
+    assert exe.stats.running == 1
+
+    queued = asyncio.ensure_future(exe.run(lambda: 1))
+    await asyncio.sleep(0)
+    assert exe.stats.queued == 1
+
+    with pytest.raises(web.HTTPServiceUnavailable):
+        await exe.run(lambda: 2)
+    assert exe.stats.rejected == 1
+
+    release.set()
+    assert await blocked is True
+    assert await queued == 1
+    exe.shutdown()
+
+
+async def test_executor_cancel() -> None:
+    """Cancelled calls are removed from the queue & never run."""
+    exe = MSALExecutor(1, max_queue=2)
+    release = threading.Event()
+    calls: list[int] = []
+
+    blocked = asyncio.ensure_future(exe.run(release.wait))
+    await asyncio.sleep(0.05)
+    waiters = [asyncio.ensure_future(exe.run(calls.append, i)) for i in range(2)]
+    await asyncio.sleep(0)
+    assert exe.stats.queued == 2
+
+    for waiter in waiters:
+        waiter.cancel()
+    await asyncio.gather(*waiters, return_exceptions=True)
+    assert exe.stats.queued == 0
+
+    release.set()
+    assert await blocked is True
+    assert await exe.run(lambda: 3) == 3
+    assert calls == []
+    exe.shutdown()
+
+
+def test_get_executor() -> None:
+    """The executor is created once from the settings."""
+    exe = get_executor()
+    assert exe is get_executor()
+    shutdown_executor()
+    assert get_executor() is not exe
+    shutdown_executor()
@@ -0,0 +1,150 @@
+"""Test the Graph helpers."""
+
+import asyncio
+from typing import Any
+from unittest.mock import MagicMock
+
+import pytest
+
+from aiohttp_msal import cache
+from aiohttp_msal.graph import BATCH_LIMIT, GraphBatch
+from aiohttp_msal.helpers import (
+    PROFILE_SELECT,
+    get_user_and_manager_info,
+    get_user_info,
+)
+from aiohttp_msal.msal_async import AsyncMSAL
+
+
+def mock_post(ses: AsyncMSAL, responses: dict[str, tuple[int, Any]]) -> MagicMock:
+    """Mock the $batch endpoint."""
+    sent = MagicMock()
+
+    def post(url: str, data: dict[str, Any]) -> MagicMock:
+        sent(url, data)
+        res = MagicMock()
+        res.ok = True
+
+        async def json() -> dict[str, Any]:
+            return {
+                "responses": [
+                    {
+                        "id": r["id"],
+                        "status": responses[r["url"]][0],
+                        "body": responses[r["url"]][1],
+                    }
+                    for r in reversed(data["requests"])
+                ]
+            }
+
+        res.json = json
+        ctx = MagicMock()
+        ctx.__aenter__.return_value = res
+        return ctx
+
+    ses.post = post  # type: ignore[method-assign,assignment]
+    return sent
+
+
+def test_batches() -> None:
+    """Requests are split, keeping dependencies together."""
+    batch = GraphBatch(AsyncMSAL({}))
+    for i in range(BATCH_LIMIT - 1):
+        batch.get(f"/users/{i}")
+    batch.add("/me/events", "POST", id="a", body={"x": 1})
+    batch.get("/me/events", id="b", depends_on=["a"])
+    batch.get("/me/events/x", id="c", depends_on=["b", "1"])
+
+    bats = batch.batches()
+    assert [len(b) for b in bats] == [BATCH_LIMIT, 2]
+    assert [r["id"] for r in bats[0][:4]] == ["1", "a", "b", "c"]
+    assert bats[0][1]["headers"] == {"Content-Type": "application/json"}
+
+    with pytest.raises(ValueError):
+        batch.get("/x", id="a")
+    with pytest.raises(ValueError):
+        batch.get("/x", depends_on=["nope"])
+
+
+async def test_send() -> None:
+    """Responses are returned by id."""
+    ses = AsyncMSAL({})
+    sent = mock_post(ses, {f"/u/{i}": (200, {"i": i}) for i in range(25)})
+    batch = ses.batch()
+    for i in range(25):
+        batch.get(f"/u/{i}")
+    res = await batch.send()
+    assert sent.call_count == 2
+    assert sent.call_args_list[0].args[0] == "https://graph.microsoft.com/v1.0/$batch"
+    assert len(res) == 25
+    assert res["25"].body == {"i": 24}
+    assert res["25"].ok
+    assert batch.requests == []
+
+
+async def test_get_user_and_manager_info(monkeypatch: pytest.MonkeyPatch) -> None:
+    """User & manager info in a single request, then from the profile cache."""
+    monkeypatch.setattr(cache, "_PROFILE_CACHE", None)
+    ses = AsyncMSAL({"oid": "o1"})
+    sent = mock_post(
+        ses,
+        {
+            f"/me?{PROFILE_SELECT}": (200, {"mail": "j@k", "displayName": "J"}),
+            f"/me/manager?{PROFILE_SELECT}": (200, {"mail": "m@k", "displayName": "M"}),
+        },
+    )
+    await get_user_and_manager_info(ses)
+    assert sent.call_count == 1
+    assert (ses.mail, ses.name) == ("j@k", "J")
+    assert (ses.manager_mail, ses.manager_name) == ("m@k", "M")
+
+    # Another session of the same user
+    ses2 = AsyncMSAL({"oid": "o1"})
+    sent = mock_post(ses2, {})
+    await get_user_and_manager_info(ses2)
+    await get_user_info(ses2)
+    assert sent.call_count == 0
+    assert (ses2.mail, ses2.manager_name) == ("j@k", "M")
+
+
+async def test_iter_collection() -> None:
+    """Pages are followed & prefetched."""
+    pages: dict[str, dict[str, Any]] = {
+        "https://graph.microsoft.com/v1.0/users": {
+            "value": [{"i": 0}, {"i": 1}],
+            "@odata.nextLink": "p2",
+        },
+        "p2": {"value": [{"i": 2}, {"i": 3}], "@odata.nextLink": "p3"},
+        "p3": {"value": [{"i": 4}]},
+    }
+    fetched = list[str]()
+    sent_params = list[dict[str, str]]()
+    ses = AsyncMSAL({})
+
+    def get(url: str, params: dict[str, str]) -> MagicMock:
+        fetched.append(url)
+        sent_params.append(params)
+        res = MagicMock()
+        res.ok = True
+
+        async def json() -> dict[str, Any]:
+            return pages[url]
+
+        res.json = json
+        ctx = MagicMock()
+        ctx.__aenter__.return_value = res
+        return ctx
+
+    ses.get = get  # type: ignore[method-assign,assignment]
+
+    items = ses.iter_collection("/users", top=2, select=["id", "mail"])
+    assert await anext(items) == {"i": 0}
+    await asyncio.sleep(0)
+    assert fetched == ["https://graph.microsoft.com/v1.0/users", "p2"]
+    assert [i["i"] async for i in items] == [1, 2, 3, 4]
+    assert sent_params == [{"$top": "2", "$select": "id,mail"}, {}, {}]
+
+    fetched.clear()
+    res = [i async for i in ses.iter_collection("/users", top=2, max_items=3)]
+    assert res == [{"i": 0}, {"i": 1}, {"i": 2}]
+    assert fetched == ["https://graph.microsoft.com/v1.0/users", "p2"]
@@ -0,0 +1,71 @@
+"""Test the per host limiter."""
+
+import asyncio
+
+import pytest
+from aiohttp import web
+
+from aiohttp_msal import limiter
+from aiohttp_msal.limiter import HostLimiter, get_limiter, limiter_stats
+from aiohttp_msal.settings import ENV
+
+
+async def test_concurrency() -> None:
+    """At most concurrency requests are in flight."""
+    lim = HostLimiter(concurrency=2)
+    peak = 0
+
+    async def req() -> None:
+        nonlocal peak
+        async with lim.acquire():
+            peak = max(peak, lim.stats.in_flight)
+            await asyncio.sleep(0.01)
+
+    await asyncio.gather(*(req() for _ in range(6)))
+    assert peak == 2
+    stats = lim.stats.asdict()
+    assert stats["completed"] == 6
+    assert stats["queued"] == stats["in_flight"] == 0
+    assert sum(stats["wait_time"].values()) == 6
+
+
+async def test_concurrency_deadline() -> None:
+    """Fail fast when waiting for a slot exceeds the deadline."""
+    lim = HostLimiter(concurrency=1, deadline=0.01)
+    async with lim.acquire():
+        with pytest.raises(web.HTTPServiceUnavailable):
+            async with lim.acquire():
+                pass
+    assert lim.stats.rejected == 1
+    assert lim.stats.queued == 0
+
+
+def test_rate() -> None:
+    """The token bucket allows a burst, then spaces requests."""
+    lim = HostLimiter(rate=10, burst=2, deadline=1)
+    assert lim.reserve() == lim.reserve() == 0
+    assert lim.reserve() == pytest.approx(0.1, abs=0.01)
+    assert lim.reserve() == pytest.approx(0.2, abs=0.01)
+    for _ in range(8):
+        lim.reserve()
+    with pytest.raises(web.HTTPServiceUnavailable):
+        lim.reserve()  # would wait > 1s
+
+
+def test_get_limiter(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Limiters are created per host (& app) when configured."""
+    monkeypatch.setattr(limiter, "_LIMITERS", {})
+    assert get_limiter("graph.microsoft.com") is None
+
+    monkeypatch.setattr(ENV, "HTTP_HOST_RATE", 5)
+    lim = get_limiter("graph.microsoft.com", "app1")
+    assert lim is get_limiter("graph.microsoft.com", "app2")
+    assert lim is not get_limiter("login.microsoftonline.com")
+
+    monkeypatch.setattr(ENV, "HTTP_LIMIT_BY_APP", True)
+    assert get_limiter("graph.microsoft.com", "app1") is not lim
+    assert set(limiter_stats()) == {
+        "graph.microsoft.com",
+        "login.microsoftonline.com",
+        "graph.microsoft.com/app1",
+    }
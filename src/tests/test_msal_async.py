@@ -1,6 +1,22 @@
 """Test the AsyncMSAL class."""
 
-from aiohttp_msal.msal_async import AsyncMSAL, Session
+import asyncio
+import json
+import time
+from typing import Any, cast
+from unittest.mock import AsyncMock, Mock, patch
+
+import pytest
+
+from aiohttp_msal.msal_async import (
+    AsyncMSAL,
+    BoundClientApplication,
+    Session,
+    bind_token_cache,
+    get_app,
+)
+from aiohttp_msal.settings import ENV
+from tests.conftest import make_token_cache
 
 
 def test_ses() -> None:
@@ -19,16 +35,148 @@ def test_ses() -> None:
     assert ses.name == ""
 
 
-# async def test_request() -> None:
-#     session = Session(None, new=True, data={"session": {"mail": "j@k", "name": "j"}})
-#     ses = AsyncMSAL(session)
-#     with patch.object(ses, "async_get_token") as mock_token:
-#         mock_token.return_value = {"access_token": ""}
+def test_shared_app(msal_env: None) -> None:
+    """The app is shared between sessions with the same kwargs."""
+    ses1 = AsyncMSAL({})
+    ses2 = AsyncMSAL({})
+    shared = cast(BoundClientApplication, ses1.app).shared_app
+    assert shared is cast(BoundClientApplication, ses2.app).shared_app
+    assert shared is get_app()
+    assert get_app({"timeout": 5}) is not shared
+
+    with pytest.raises(RuntimeError):
+        shared.get_accounts()
+    with bind_token_cache(ses1.token_cache):
+        assert shared.get_accounts() == []
+
+    # The session's app binds its token cache
+    ses3 = AsyncMSAL({AsyncMSAL.token_cache_key: make_token_cache()})
+    assert len(ses3.app.get_accounts()) == 1
+    assert ses3.app.token_cache is ses3.token_cache
+    assert ses1.app.get_accounts() == []
+    assert ses1.app.client_id == shared.client_id
+
+
+async def test_shared_app_token_cache(msal_env: None) -> None:
+    """Each session uses its own token cache on the shared app."""
+    sessions = [
+        AsyncMSAL({AsyncMSAL.token_cache_key: make_token_cache(f"u{i}", f"at{i}")})
+        for i in range(10)
+    ]
+    tokens = await asyncio.gather(*(ses.async_get_token() for ses in sessions))
+    assert [t["access_token"] for t in tokens if t] == [f"at{i}" for i in range(10)]
+
+    assert AsyncMSAL({}).get_token() is None
+
+
+async def test_async_get_token_fast_path(msal_env: None) -> None:
+    """A valid cached access token does not use an executor thread."""
+    ses = AsyncMSAL({AsyncMSAL.token_cache_key: make_token_cache()})
+    with patch("aiohttp_msal.msal_async.run_in_executor") as run_in_executor:
+        token = await ses.async_get_token()
+    run_in_executor.assert_not_called()
+    assert token and token["access_token"] == "at"
+    assert token["token_source"] == "cache"
+
+    # Expired tokens are refreshed by MSAL
+    ses = AsyncMSAL({AsyncMSAL.token_cache_key: make_token_cache(expires_in=60)})
+    assert ses.get_cached_token() is None
+    assert AsyncMSAL({}).get_cached_token() is None
+    assert ses.get_cached_token(["Mail.Send"]) is None
+
+
+async def test_async_refresh_token_single_flight(msal_env: None) -> None:
+    """Concurrent refreshes for the same account run once, all sessions save."""
+    expired = make_token_cache(expires_in=60)
+    saved = list[Any]()
+    sessions = [
+        AsyncMSAL({AsyncMSAL.token_cache_key: expired}, save_callback=saved.append)
+        for _ in range(4)
+    ]
+    # Sharing the session of the refresh, not saved again
+    sessions.insert(1, AsyncMSAL(sessions[0].session, save_callback=saved.append))
+
+    def get_token(self: AsyncMSAL, force_refresh: bool) -> dict[str, Any]:
+        time.sleep(0.05)
+        self.token_cache.deserialize(make_token_cache(access_token="new"))
+        self.token_cache.has_state_changed = True
+        self.save_token_cache()
+        return {"access_token": "new"}
 
-#         async with ses.request_ctx("get", "http://httpbin.org.get") as resp:
-#             if resp.ok:
-#                 return
+    with patch.object(AsyncMSAL, "get_token", autospec=True) as mock:
+        mock.side_effect = get_token
+        tokens = await asyncio.gather(*(ses.async_get_token() for ses in sessions))
+
+    assert mock.call_count == 1
+    assert len(saved) == 4
+    assert tokens == [{"access_token": "new"}] * 5
+    for ses in sessions:
+        assert not ses.token_cache.has_state_changed
+        assert ses.get_cached_token() == {
+            "access_token": "new",
+            "token_type": "Bearer",
+            "expires_in": pytest.approx(3600, abs=2),
+            "token_source": "cache",
+        }
+
+
+def test_compact_token_cache(msal_env: None) -> None:
+    """Unused credentials are not saved in the session."""
+    blob = make_token_cache()
+    session: dict[str, Any] = {AsyncMSAL.token_cache_key: blob}
+    ses = AsyncMSAL(session)
+    ses.token_cache.has_state_changed = True
+    ses.save_token_cache()
+
+    saved = json.loads(session[AsyncMSAL.token_cache_key])
+    assert len(session[AsyncMSAL.token_cache_key]) < len(blob)
+    assert "IdToken" not in saved or not saved["IdToken"]
+    assert len(saved["AccessToken"]) == len(saved["RefreshToken"]) == 1
+    assert ses.get_cached_token()
+    assert session[AsyncMSAL.scopes_key] == "user.read user.read.all"
+
+    # Expired access tokens are removed
+    ses = AsyncMSAL({AsyncMSAL.token_cache_key: make_token_cache(expires_in=-10)})
+    assert ses.compact_token_cache() > 0
+    assert not list(ses.token_cache.search("AccessToken"))
+    assert ses.compact_token_cache() == 0
+
+
+async def test_token_cache_redis(
+    msal_env: None, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """The token cache is stored in its own Redis key."""
+    store: dict[str, Any] = {}
+    db = Mock()
+    db.get = AsyncMock(side_effect=store.get)
+    db.set = AsyncMock(side_effect=lambda k, v, ex: store.__setitem__(k, v))
+    monkeypatch.setattr(ENV, "database", db)
+    monkeypatch.setattr(ENV, "TOKEN_CACHE_REDIS", True)
+
+    # An inline token cache is moved to Redis when saved
+    session: dict[str, Any] = {AsyncMSAL.token_cache_key: make_token_cache()}
+    ses = AsyncMSAL(session)
+    ses.token_cache.has_state_changed = True
+    ses.save_token_cache()
+    await ses.async_save_token_cache()
+    assert AsyncMSAL.token_cache_key not in session
+    ref = session[AsyncMSAL.token_cache_ref_key]
+    assert ref.startswith(AsyncMSAL.token_cache_redis_prefix)
+    assert list(store) == [ref]
+    # Dict sessions have no creation time, expire after the max session age
+    assert db.set.await_args.kwargs["ex"] == ENV.SESSION_MAX_AGE  # type: ignore[union-attr]
+
+    # Loaded only when a token is required
+    ses = AsyncMSAL(session)
+    with pytest.raises(RuntimeError):
+        ses.get_cached_token()
+    db.get.assert_not_awaited()
+    token = await ses.async_get_token()
+    assert token and token["access_token"] == "at"
+    db.get.assert_awaited_once_with(ref)
 
-#         async with ses.get("http://httpbin.org.get") as resp:
-#             if resp.ok:
-#                 return
+    # Or from the session's Redis connection
+    monkeypatch.setattr(ENV, "database", None)
+    ses = AsyncMSAL(session, redis=db)
+    assert await ses.async_get_token()
+    assert db.get.await_count == 2
@@ -2,15 +2,18 @@
 
 import asyncio
 import json
+import time
 from collections.abc import AsyncGenerator
 from json import dumps
 from typing import Any
 from unittest.mock import AsyncMock, MagicMock, Mock, call
 
+import fakeredis
 import pytest
-from redis.asyncio import Redis
+from redis.asyncio import Redis, RedisCluster
 
 from aiohttp_msal import redis_tools
+from aiohttp_msal.codec import MAGIC
 from aiohttp_msal.msal_async import AsyncMSAL
 from aiohttp_msal.redis_tools import session_iter
 from aiohttp_msal.settings import ENV
@@ -34,7 +37,7 @@ def redis() -> Redis:
 
     red = Mock()
     red.scan_iter = MagicMock(side_effect=scan_iter)
-    red.get = AsyncMock(side_effect=list(testdata.values()))
+    red.mget = AsyncMock(side_effect=lambda keys: [testdata[k] for k in keys])
     return red
 
 
@@ -121,10 +124,12 @@ async def test_redis_scan_keys_and_set_set(monkeypatch: pytest.MonkeyPatch) -> N
 async def test_async_msal_factory_save_callback(
     monkeypatch: pytest.MonkeyPatch,
 ) -> None:
-    """Prepare ENV.database to capture set calls."""
+    """Saves are coalesced & written with a pipeline."""
     async_db = Mock()
-    async_db.set = AsyncMock()
+    pipe = mock_pipeline(async_db)
     monkeypatch.setattr(ENV, "database", async_db)
+    writer = redis_tools.SessionWriter(delay=0)
+    monkeypatch.setitem(redis_tools._WRITERS, asyncio.get_running_loop(), writer)
 
     key = "sess:1"
     created = 123
@@ -133,17 +138,87 @@ async def test_async_msal_factory_save_callback(
     inst = redis_tools.async_msal_factory(AsyncMSAL, key, created, session)
     assert isinstance(inst, AsyncMSAL)
 
-    # Call the save callback, which schedules an async task to write to redis
-    if inst.save_callback:
-        inst.save_callback({})
+    # Call the save callback twice, which queues a single write to redis
+    assert inst.save_callback
+    inst.save_callback({})
+    inst.save_callback({})
+    assert list(writer.pending) == [key]
+    await asyncio.sleep(0.01)
 
-    # Allow scheduled task to run
-    await asyncio.sleep(0)
-
-    async_db.set.assert_awaited()
-    called_key, called_val = async_db.set.await_args.args  # type: ignore[union-attr]
+    assert pipe.set.call_count == 1
+    called_key, called_val = pipe.set.call_args.args
     assert called_key == key
     assert json.loads(called_val) == {"created": created, "session": session}
+    assert writer.written == 1
+    assert not writer.tasks
+
+
+async def test_session_writer_drain(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Drain writes pending sessions in batches, failed ones remain pending."""
+    async_db = Mock()
+    pipe = mock_pipeline(async_db)
+    monkeypatch.setattr(ENV, "database", async_db)
+    writer = redis_tools.SessionWriter(delay=60, batch_size=2)
+    ses = AsyncMock()
+    for idx in range(3):
+        writer.add(f"s{idx}", 1, {}, ses)
+
+    pipe.execute.side_effect = ConnectionError("down")
+    with pytest.raises(ConnectionError):
+        await writer.drain()
+    assert sorted(writer.pending) == ["s0", "s1", "s2"]
+
+    pipe.execute.side_effect = None
+    await writer.drain()
+    assert not writer.pending
+    assert writer.written == 3
+    assert pipe.execute.await_count == 3
+    assert ses.async_save_token_cache.await_count == 5
+
+
+async def test_session_writer_connection(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Sessions are written to the connection they were loaded from."""
+    monkeypatch.setattr(ENV, "database", None)
+    monkeypatch.setattr(ENV, "REDIS", "redis://invalid:1")
+    writer = redis_tools.SessionWriter(delay=60)
+    monkeypatch.setitem(redis_tools._WRITERS, asyncio.get_running_loop(), writer)
+    red1, red2 = fakeredis.FakeAsyncRedis(), fakeredis.FakeAsyncRedis()
+    for key, red in (("s1", red1), ("s2", red2)):
+        inst = redis_tools.async_msal_factory(
+            AsyncMSAL, key, int(time.time()), {"mail": key}, redis=red
+        )
+        inst.save_callback({})  # type: ignore[misc]
+
+    await writer.drain()
+    assert writer.written == 2
+    assert await red1.keys() == [b"s1"]
+    assert await red2.keys() == [b"s2"]
+    assert (val := await red2.get("s2"))
+    assert json.loads(val)["session"] == {"mail": "s2"}
+
+
+def test_session_writer_loop_closed(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Pending sessions are written when asyncio.run ends within the delay."""
+    async_db = Mock()
+    pipe = mock_pipeline(async_db)
+    monkeypatch.setattr(ENV, "database", async_db)
+
+    async def job(key: str) -> None:
+        inst = redis_tools.async_msal_factory(AsyncMSAL, key, 1, {})
+        inst.save_callback({})  # type: ignore[misc]
+
+    asyncio.run(job("k1"))
+    asyncio.run(job("k2"))
+    assert [c.args[0] for c in pipe.set.call_args_list] == ["k1", "k2"]
+
+
+def test_async_msal_factory_no_loop(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Without an event loop the session is written immediately."""
+    write = AsyncMock()
+    monkeypatch.setattr(redis_tools.SessionWriter, "write", write)
+    inst = redis_tools.async_msal_factory(AsyncMSAL, "k", 1, {})
+    inst.save_callback({})  # type: ignore[misc]
+    assert list(write.await_args.args[0]) == ["k"]  # type: ignore[union-attr]
 
 
 @pytest.mark.asyncio
@@ -156,8 +231,14 @@ async def test_get_session_returns_instance(monkeypatch: pytest.MonkeyPatch) ->
         yield "k", 1, {"mail": "u@example.com", "token_cache": ""}
 
     monkeypatch.setattr(redis_tools, "session_iter", fake_iter)
+    red = Mock(smembers=AsyncMock(return_value=set()), sadd=AsyncMock())
+
+    with pytest.raises(ValueError):  # Not indexed
+        await redis_tools.get_session(AsyncMSAL, "u@example.com", redis=red)
 
-    inst = await redis_tools.get_session(AsyncMSAL, "u@example.com", redis=Mock())
+    inst = await redis_tools.get_session(
+        AsyncMSAL, "u@example.com", redis=red, scan=True
+    )
     assert isinstance(inst, AsyncMSAL)
     assert inst.session.get("mail") == "u@example.com"
 
@@ -170,4 +251,338 @@ async def test_get_session_returns_instance(monkeypatch: pytest.MonkeyPatch) ->
 
     monkeypatch.setattr(redis_tools, "session_iter", empty_iter)
     with pytest.raises(ValueError):
-        await redis_tools.get_session(AsyncMSAL, "not@here")
+        await redis_tools.get_session(AsyncMSAL, "not@here", redis=red, scan=True)
+
+
+async def test_session_iter_batches() -> None:
+    """Keys are fetched with one MGET per batch."""
+    keys = [f"s{i}" for i in range(5)]
+
+    async def scan_iter(*, count: int, match: str) -> AsyncGenerator[bytes, None]:
+        assert count == 2
+        for key in keys:
+            yield key.encode()
+
+    red = Mock()
+    red.scan_iter = MagicMock(side_effect=scan_iter)
+    red.mget = AsyncMock(
+        side_effect=lambda batch: [
+            dumps({"created": 1, "session": {"key": k}}) for k in batch
+        ]
+    )
+    res = [key async for key, _, _ in session_iter(red, batch_size=2)]
+    assert res == keys
+    assert red.mget.call_args_list == [
+        call(["s0", "s1"]),
+        call(["s2", "s3"]),
+        call(["s4"]),
+    ]
+
+    red.mget = AsyncMock(side_effect=ConnectionError("down"))
+    with pytest.raises(ConnectionError):
+        async for _ in session_iter(red, batch_size=2):
+            pass
+
+
+async def test_get_session_index() -> None:
+    """Sessions are found with the mail index & stale entries are removed."""
+    sessions = {
+        "s1": dumps({"created": 1, "session": {"mail": "U@example.com"}}),
+        "s2": None,
+        "s3": dumps({"created": 1, "session": {"mail": "other@example.com"}}),
+    }
+    red = Mock()
+    red.smembers = AsyncMock(return_value={b"s1", b"s2", b"s3"})
+    red.mget = AsyncMock(side_effect=lambda keys: [sessions[k] for k in keys])
+    red.srem = AsyncMock()
+    red.scan_iter = Mock(side_effect=AssertionError("no scan expected"))
+
+    inst = await redis_tools.get_session(AsyncMSAL, " u@Example.com", redis=red)
+    assert inst.mail == "U@example.com"
+    red.smembers.assert_awaited_once_with("msal_mail_u@example.com")
+    red.srem.assert_awaited_once_with("msal_mail_u@example.com", "s2", "s3")
+
+
+async def test_session_index_rebuild() -> None:
+    """All sessions with a mail are indexed in pipelined batches."""
+
+    async def scan_iter(*, count: int, match: str) -> AsyncGenerator[str, None]:
+        for key in ("s1", "s2"):
+            yield key
+
+    red = Mock()
+    red.scan_iter = MagicMock(side_effect=scan_iter)
+    red.mget = AsyncMock(
+        return_value=[dumps({"created": 1, "session": {"mail": "A@k"}}), b"x"]
+    )
+    pipe = red.pipeline.return_value
+    pipe.execute = AsyncMock()
+    assert await redis_tools.session_index_rebuild(red) == 1
+    pipe.sadd.assert_called_once_with("msal_mail_a@k", "s1")
+
+
+async def test_get_session_scope(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Sessions are filtered on the scopes key, without loading the token cache."""
+    sessions = {
+        "s1": dumps({"created": 1, "session": {"mail": "u@k", "scopes": "user.read"}}),
+        "s2": dumps(
+            {
+                "created": 1,
+                "session": {
+                    "mail": "u@k",
+                    "scopes": "https://graph.microsoft.com/mail.send user.read",
+                },
+            }
+        ),
+    }
+    red = Mock()
+    red.smembers = AsyncMock(return_value={"s1", "s2"})
+    red.mget = AsyncMock(side_effect=lambda keys: [sessions[k] for k in keys])
+    load = AsyncMock()
+    monkeypatch.setattr(AsyncMSAL, "async_load_token_cache", load)
+
+    inst = await redis_tools.get_session(AsyncMSAL, "u@k", redis=red, scope="Mail.Send")
+    assert inst.session["scopes"].startswith("https://")
+    load.assert_awaited_once()
+
+    with pytest.raises(ValueError, match="2 checked"):
+        await redis_tools.get_session(AsyncMSAL, "u@k", redis=red, scope="files.read")
+
+
+def mock_pipeline(red: Mock) -> Mock:
+    """Mock a pipeline with an awaitable execute."""
+    pipe = red.pipeline.return_value
+    pipe.execute = AsyncMock()
+    return pipe  # type: ignore[no-any-return]
+
+
+async def test_session_clean(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Invalid sessions are unlinked in batches, at most ops_per_sec."""
+    now = int(time.time())
+    sessions = {
+        "old": dumps(
+            {
+                "created": 1,
+                "session": {
+                    **dict.fromkeys(redis_tools.SES_KEYS, "a"),
+                    "token_cache_ref": "tc_old",
+                },
+            }
+        ),
+        "nokeys": dumps({"created": now, "session": {"mail": "b"}}),
+        "gone": None,
+        "ok": dumps(
+            {"created": now, "session": dict.fromkeys(redis_tools.SES_KEYS, "c")}
+        ),
+    }
+
+    async def scan_iter(*, count: int, match: str) -> AsyncGenerator[str, None]:
+        if not match.startswith("msal_token_cache_"):
+            for key in sessions:
+                yield key
+
+    red = Mock()
+    red.scan_iter = MagicMock(side_effect=scan_iter)
+    red.mget = AsyncMock(side_effect=lambda keys: [sessions[k] for k in keys])
+    pipe = mock_pipeline(red)
+    sleep = AsyncMock()
+    monkeypatch.setattr(asyncio, "sleep", sleep)
+
+    await redis_tools.session_clean(red, batch_size=2, ops_per_sec=1)
+    assert pipe.unlink.call_args_list == [
+        call("old", "tc_old", "nokeys"),
+        call("gone"),
+    ]
+    assert pipe.srem.call_args_list == [
+        call("msal_mail_a", "old"),
+        call("msal_mail_b", "nokeys"),
+    ]
+    assert pipe.execute.await_count == 2
+    assert 1.9 < sleep.await_args.args[0] <= 2  # type: ignore[union-attr]
+
+
+async def test_session_expire() -> None:
+    """Existing sessions get a TTL from their creation."""
+    created = int(time.time()) - 100
+
+    async def scan_iter(*, count: int, match: str) -> AsyncGenerator[str, None]:
+        for key in ("s1", "bad"):
+            yield key
+
+    red = Mock()
+    red.scan_iter = MagicMock(side_effect=scan_iter)
+    red.mget = AsyncMock(
+        return_value=[dumps({"created": created, "session": {}}), b"x"]
+    )
+    pipe = mock_pipeline(red)
+    assert await redis_tools.session_expire(red, max_age=1000) == 1
+    key, ttl = pipe.expire.call_args.args
+    assert key == "s1"
+    assert 898 <= ttl <= 900
+
+
+async def test_session_iter_server_side(redis: Redis) -> None:
+    """Sessions are matched by the Lua script, compressed ones in Python."""
+    script = AsyncMock(return_value=[0, 0, b"b", redis_tools.encode_session({})])
+    redis.register_script = Mock(return_value=script)  # type: ignore[method-assign]
+    res = [
+        key
+        async for key, _, _ in session_iter(
+            redis, match={"b": "2"}, key_match="a*", server_side=True
+        )
+    ]
+    assert res == []  # the returned session does not match
+    assert redis.register_script.call_args.args == (redis_tools.SESSION_SCRIPT,)
+    kwargs = script.await_args.kwargs  # type: ignore[union-attr]
+    assert kwargs["keys"] == ["a", "b", "c"]
+    assert kwargs["args"][0] == "match"
+    assert json.loads(kwargs["args"][1]) == {"b": "2"}
+    redis.mget.assert_not_awaited()  # type: ignore[attr-defined]
+
+
+async def test_session_clean_server_side() -> None:
+    """Sessions are removed by the Lua script, compressed ones in Python."""
+
+    async def scan_iter(*, count: int, match: str) -> AsyncGenerator[str, None]:
+        if not match.startswith("msal_token_cache_"):
+            for key in ("s1", "s2", "s3"):
+                yield key
+
+    red = Mock()
+    red.scan_iter = MagicMock(side_effect=scan_iter)
+    red.register_script.return_value = script = AsyncMock(
+        return_value=[2, 0, "s3", b"\xffM\x01\x01bad"]
+    )
+    pipe = mock_pipeline(red)
+    await redis_tools.session_clean(red, server_side=True)
+    args = script.await_args.kwargs["args"]  # type: ignore[union-attr]
+    assert args[0] == "clean"
+    assert json.loads(args[3]) == list(redis_tools.SES_KEYS)
+    assert args[4:] == ["msal_mail_", b"\xffM", "token_cache_ref"]
+    assert pipe.unlink.call_args_list == [call("s3")]
+
+    await redis_tools.invalid_sessions(red, server_side=True)
+    args = script.await_args.kwargs["args"]  # type: ignore[union-attr]
+    assert [args[0], json.loads(args[1]), args[2], json.loads(args[3])] == [
+        "clean",
+        {},
+        0,
+        [],
+    ]
+    assert pipe.unlink.call_args_list == [call("s3"), call("s3")]
+
+
+async def test_session_script(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Run SESSION_SCRIPT, compressed sessions are returned to Python."""
+    monkeypatch.setattr(ENV, "SESSION_COMPRESSION", "zlib")
+    monkeypatch.setattr(ENV, "SESSION_COMPRESS_MIN", 100)
+    now = int(time.time())
+    full = dict.fromkeys(redis_tools.SES_KEYS, "x")
+    red = fakeredis.FakeAsyncRedis()
+    sessions = {
+        "ses_zip": {"created": now, "session": {**full, "pad": "p" * 200}},
+        "ses_ok": {"created": now, "session": {**full, "mail": " A@b "}},
+        "ses_old": {
+            "created": 1,
+            "session": {
+                **full,
+                "mail": " A@b ",
+                "token_cache_ref": "msal_token_cache_1",
+            },
+        },
+    }
+    for key, val in sessions.items():
+        await red.set(key, redis_tools.encode_session(val))
+    await red.set("ses_bad", b"{")
+    await red.set("msal_token_cache_1", b"tc")
+    await red.set("msal_token_cache_2", b"tc")
+    await red.sadd("msal_mail_a@b", "ses_ok", "ses_old")
+    assert (await red.get("ses_zip"))[:2] == MAGIC  # type: ignore[index]
+
+    res = [
+        key
+        async for key, _, _ in session_iter(
+            red, match={"mail": "A@"}, key_match="ses_*", server_side=True
+        )
+    ]
+    assert sorted(res) == ["ses_ok", "ses_old"]
+    res = [
+        key
+        async for key, _, _ in session_iter(
+            red, match={"pad": "p"}, key_match="ses_*", server_side=True
+        )
+    ]
+    assert res == ["ses_zip"]
+
+    monkeypatch.setattr(ENV, "COOKIE_NAME", "ses")
+    await redis_tools.session_clean(red, server_side=True)
+    assert sorted(await red.keys("ses_*")) == [b"ses_ok", b"ses_zip"]
+    assert await red.smembers("msal_mail_a@b") == {b"ses_ok"}
+    assert await red.keys("msal_token_cache_*") == [b"msal_token_cache_2"]
+    assert 89 * 86400 < await red.ttl("msal_token_cache_2") <= 90 * 86400
+
+
+async def test_scan_values_cluster() -> None:
+    """Cluster primaries are scanned in parallel & keys unlinked one per command."""
+    nodes = {"n1": ["k1", "k2", "k3"], "n2": ["k4"], "n3": ["k5", "k6"]}
+    running = peak = 0
+
+    async def scan_iter(
+        *, count: int, match: str, target_nodes: str
+    ) -> AsyncGenerator[str, None]:
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        for key in nodes[target_nodes]:
+            await asyncio.sleep(0)
+            yield key
+        running -= 1
+
+    red = Mock(spec=RedisCluster)
+    red.get_primaries.return_value = list(nodes)
+    red.scan_iter = MagicMock(side_effect=scan_iter)
+    red.mget_nonatomic = AsyncMock(side_effect=lambda keys: [k.encode() for k in keys])
+    res = [
+        batch
+        async for batch in redis_tools.scan_values(red, batch_size=2, concurrency=2)
+    ]
+    assert sorted(k for batch in res for k, _ in batch) == [
+        f"k{i}" for i in range(1, 7)
+    ]
+    assert all(len(batch) <= 2 for batch in res)
+    assert peak == 2
+
+    pipe = mock_pipeline(red)
+    unlink = redis_tools.BatchUnlink(red)
+    await unlink.add("k1", "a@b")
+    await unlink.add("k2")
+    await unlink.flush()
+    assert pipe.unlink.call_args_list == [call("k1"), call("k2")]
+
+    red.mget_nonatomic.side_effect = ConnectionError("down")
+    with pytest.raises(ConnectionError):
+        async for _ in redis_tools.scan_values(red):
+            pass
+    with pytest.raises(ValueError):
+        async for _ in session_iter(red, match={"a": "b"}, server_side=True):
+            pass
+
+
+def test_redis_from_url(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Cluster & Sentinel URLs."""
+    cluster = Mock()
+    monkeypatch.setattr(redis_tools.RedisCluster, "from_url", cluster)
+    redis_tools.redis_from_url("rediss+cluster://u:p@c1:7000")
+    cluster.assert_called_once_with("rediss://u:p@c1:7000")
+
+    sentinel = Mock()
+    monkeypatch.setattr(redis_tools, "Sentinel", sentinel)
+    redis_tools.redis_from_url("redis+sentinel://:pw@s1:1,s2/mymaster/2")
+    sentinel.assert_called_once_with([("s1", 1), ("s2", 26379)])
+    sentinel.return_value.master_for.assert_called_once_with(
+        "mymaster", db=2, username=None, password="pw", ssl=False
+    )
+    with pytest.raises(ValueError):
+        redis_tools.redis_from_url("redis+sentinel://s1")
+
+    assert isinstance(redis_tools.redis_from_url("redis://r1:6379/1"), Redis)
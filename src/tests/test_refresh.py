@@ -0,0 +1,79 @@
+"""Test the background token refresher."""
+
+import json
+import time
+from typing import Any
+from unittest.mock import AsyncMock, Mock, patch
+
+import fakeredis
+
+from aiohttp_msal.msal_async import AsyncMSAL, Session
+from aiohttp_msal.refresh import TokenRefresher
+from tests.conftest import make_token_cache
+
+
+async def test_refresh(msal_env: None) -> None:
+    """Only tokens that expire soon are refreshed."""
+    caches = {
+        "AIOHTTP_SESSION_soon": make_token_cache(expires_in=400),
+        "AIOHTTP_SESSION_later": make_token_cache(expires_in=3600),
+    }
+    redis = Mock()
+    redis.get = AsyncMock(
+        side_effect=lambda key: (
+            json.dumps({"created": 1, "session": {"token_cache": caches[key]}})
+            if key in caches
+            else None
+        )
+    )
+
+    ref = TokenRefresher()
+    for ident in ("soon", "later", "gone"):
+        ref.touch(AsyncMSAL(Session(ident, new=False, data=None)))
+    ref.touch(AsyncMSAL({}))
+    ref.sessions["AIOHTTP_SESSION_stale"] = (time.time() - ref.active - 1, AsyncMSAL)
+    assert len(ref.sessions) == 4
+
+    with patch.object(
+        AsyncMSAL, "async_refresh_token", return_value={"access_token": "new"}
+    ) as mock:
+        assert await ref.refresh(redis) == 1
+    mock.assert_awaited_once_with(force_refresh=True)
+    assert list(ref.sessions) == ["AIOHTTP_SESSION_soon", "AIOHTTP_SESSION_later"]
+
+
+async def test_refresh_logout(msal_env: None) -> None:
+    """The refreshed session is not saved if it changed, e.g. on logout."""
+    redis = fakeredis.FakeAsyncRedis()
+    key = "AIOHTTP_SESSION_soon"
+    session = {"mail": "u@k", "token_cache": make_token_cache(expires_in=400)}
+    logout = False
+
+    async def refresh(ses: AsyncMSAL, **_: Any) -> dict[str, Any]:
+        ses.session["token_cache"] = "new"
+        if logout:
+            await redis.delete(key)
+        return {"access_token": "new"}
+
+    ref = TokenRefresher()
+    with patch.object(AsyncMSAL, "async_refresh_token", refresh):
+        for logout in (False, True):
+            created = int(time.time())
+            await redis.set(key, json.dumps({"created": created, "session": session}))
+            ref.touch(AsyncMSAL(Session("soon", new=False, data=None)))
+            assert await ref.refresh(redis) == 1
+            if logout:
+                assert await redis.get(key) is None
+            else:
+                assert (saved := await redis.get(key))
+                assert json.loads(saved)["session"]["token_cache"] == "new"
+
+
+async def test_cleanup_ctx() -> None:
+    """The refresher tracks sessions while the app runs."""
+    ref = TokenRefresher()
+    ctx = ref.cleanup_ctx(Mock())
+    await anext(ctx)
+    assert AsyncMSAL.token_refresher is ref
+    await ctx.aclose()
+    assert AsyncMSAL.token_refresher is None
@@ -0,0 +1,72 @@
+"""Test the routes."""
+
+from collections.abc import AsyncIterator, Callable
+from unittest.mock import MagicMock, patch
+
+import pytest
+from aiohttp.test_utils import make_mocked_request
+
+from aiohttp_msal import cache
+from aiohttp_msal.msal_async import AsyncMSAL
+from aiohttp_msal.routes import user_photo
+from tests.conftest import make_token_cache
+
+
+def mock_photo() -> tuple[MagicMock, Callable[[AsyncMSAL, str], MagicMock]]:
+    """Mock the Graph photo endpoint."""
+    sent = MagicMock()
+
+    def get(self: AsyncMSAL, url: str) -> MagicMock:
+        sent(url)
+
+        async def iter_chunked(_: int) -> AsyncIterator[bytes]:
+            yield b"jpeg"
+
+        res = MagicMock(status=200, content_length=4)
+        res.headers = {"ETag": '"p1"', "Content-Type": "image/jpeg"}
+        res.content.iter_chunked = iter_chunked
+        ctx = MagicMock()
+        ctx.__aenter__.return_value = res
+        return ctx
+
+    return sent, get
+
+
+async def test_user_photo(monkeypatch: pytest.MonkeyPatch) -> None:
+    """The photo is cached & revalidated with ETag."""
+    monkeypatch.setattr(cache, "_PHOTO_CACHE", None)
+    session = {"mail": "u1@k", "token_cache": make_token_cache("u1")}
+    sent, get = mock_photo()
+    with (
+        patch("aiohttp_msal.get_session", return_value=session),
+        patch.object(AsyncMSAL, "get", get),
+    ):
+        res = await user_photo(make_mocked_request("GET", "/user/photo"))
+        assert res.status == 200
+        assert res.headers["ETag"] == '"p1"'
+        assert res.headers["Cache-Control"] == "private, max-age=3600"
+        assert sent.call_count == 1
+
+        res = await user_photo(
+            make_mocked_request(
+                "GET", "/user/photo", headers={"If-None-Match": 'W/"p1"'}
+            )
+        )
+        assert res.status == 304
+
+        res = await user_photo(make_mocked_request("GET", "/user/photo"))
+        assert res.status == 200
+        assert res.body == b"jpeg"  # type: ignore[attr-defined]
+        assert res.content_type == "image/jpeg"
+        assert sent.call_count == 1
+
+
+async def test_photo_cache_budget() -> None:
+    """Photos are evicted when the cache exceeds its size."""
+    pcache = cache.PhotoCache(max_bytes=10, ttl=0)
+    await pcache.set("a", cache.Photo(b"123456"))
+    await pcache.set("b", cache.Photo(b"123456"))
+    assert await pcache.get("a") is None
+    photo = await pcache.get("b")
+    assert photo and photo.etag.startswith('"')
+    assert cache.Photo.loadb(photo.dumpb()) == photo
@@ -1,11 +1,14 @@
 """Test settings."""
 
+import json
 from dataclasses import dataclass, field
 from pathlib import Path
+from typing import Any
 from unittest.mock import patch
 
 import pytest
 
+from aiohttp_msal.codec import encode_session
 from aiohttp_msal.settings import ENV, VAR_REQ, SettingsBase
 
 
@@ -38,11 +41,40 @@ def test_load() -> None:
     ):
         ENV.load("Y_")
     expected = {
+        "Y_BREAKER_COOLDOWN": 30,
+        "Y_BREAKER_FAILURES": 5,
         "Y_COOKIE_NAME": "AIOHTTP_SESSION",
         "Y_DOMAIN": "y.com",
+        "Y_EXECUTOR_QUEUE": 200,
+        "Y_EXECUTOR_WORKERS": 8,
+        "Y_HTTP_CONNECT_TIMEOUT": 10,
+        "Y_HTTP_DNS_TTL": 300,
+        "Y_HTTP_HOST_BURST": 0,
+        "Y_HTTP_HOST_CONCURRENCY": 0,
+        "Y_HTTP_HOST_RATE": 0,
+        "Y_HTTP_KEEPALIVE": 30,
+        "Y_HTTP_LIMIT": 200,
+        "Y_HTTP_LIMIT_BY_APP": False,
+        "Y_HTTP_LIMIT_PER_HOST": 100,
+        "Y_HTTP_QUEUE_DEADLINE": 0,
+        "Y_HTTP_TIMEOUT": 60,
+        "Y_HTTP_WARMUP": "https://graph.microsoft.com/",
+        "Y_PHOTO_CACHE_BYTES": 16777216,
+        "Y_PHOTO_CACHE_REDIS": False,
+        "Y_PHOTO_CACHE_TTL": 3600,
+        "Y_PROFILE_CACHE": 10000,
+        "Y_PROFILE_CACHE_REDIS": True,
+        "Y_PROFILE_CACHE_TTL": 3600,
         "Y_REDIS": "redis://redis1:6379",
+        "Y_RESPONSE_CACHE": 0,
+        "Y_RESPONSE_CACHE_REDIS": False,
+        "Y_RESPONSE_CACHE_TTL": 3600,
+        "Y_SESSION_COMPRESSION": "",
+        "Y_SESSION_COMPRESS_MIN": 1024,
+        "Y_SESSION_MAX_AGE": 7776000,
         "Y_SP_APP_ID": "i2",
         "Y_SP_AUTHORITY": "a2",
+        "Y_TOKEN_CACHE_REDIS": False,
     }
     assert ENV.asdict() == expected
     expected["Y_SP_APP_PW"] = "***"
@@ -94,3 +126,19 @@ def test_types() -> None:
 def test_db() -> None:
     """Test database settings."""
     assert not ENV.database
+
+
+def test_json_dumpb(monkeypatch: pytest.MonkeyPatch) -> None:
+    """json_dumpb uses a replaced json_dumps."""
+    assert json.loads(ENV.json_dumpb({"a": 1})) == {"a": 1}
+    monkeypatch.setattr(ENV, "json_dumps", lambda obj: "custom")
+    assert ENV.json_dumpb({"a": 1}) == b"custom"
+    assert encode_session({"a": 1}) == b"custom"
+
+
+@pytest.mark.parametrize("obj", [{1: "a"}, {"n": 2**70}])
+def test_json_dumps_stdlib(obj: dict[Any, Any]) -> None:
+    """Payloads supported by json are serialized, also with orjson installed."""
+    expected = json.loads(json.dumps(obj))
+    assert json.loads(ENV.json_dumps(obj)) == expected
+    assert json.loads(ENV.json_dumpb(obj)) == expected
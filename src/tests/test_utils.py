@@ -1,6 +1,14 @@
 """Test utils."""
 
-from aiohttp_msal.utils import async_wrap
+import time
+from email.utils import formatdate
+from unittest.mock import AsyncMock, Mock, call, patch
+
+import pytest
+from aiohttp import web
+
+from aiohttp_msal.msal_async import AsyncMSAL
+from aiohttp_msal.utils import RetryPolicy, async_wrap, parse_retry_after
 
 
 async def test_async_wrap() -> None:
@@ -20,3 +28,86 @@ async def test_async_wrap() -> None:
 
     the_res = await async_wrap(more_blocking_func)(3)
     assert the_res == 24
+
+
+def test_parse_retry_after() -> None:
+    """Test Retry-After as seconds or HTTP date."""
+    assert parse_retry_after(None) is None
+    assert parse_retry_after("7") == 7
+    assert parse_retry_after("nonsense") is None
+    date = formatdate(time.time() + 60, usegmt=True)
+    assert 55 < (parse_retry_after(date) or 0) <= 60
+
+
+def test_retry_policy_delay() -> None:
+    """Test backoff, per-call & global budgets."""
+    pol = RetryPolicy(attempts=3, base=1, cap=4, max_wait=10, budget_max=2)
+    assert all(0 <= pol.backoff(n) <= min(4, 2**n) for n in range(6) for _ in range(9))
+    assert pol.delay(0, 0, retry_after=3) == 3
+    assert pol.delay(1, 3, retry_after=8) is None  # exceeds max_wait
+    assert pol.delay(3, 0) is None  # attempts
+    assert pol.delay(1, 3, retry_after=1) == 1
+    assert pol.tokens == 0
+    assert pol.delay(0, 0, retry_after=1) is None  # global budget
+
+
+async def test_retry_decorator() -> None:
+    """Test the decorator only retries retryable errors."""
+    calls: list[str] = []
+    pol = RetryPolicy()
+
+    @pol
+    async def func(err: Exception) -> str:
+        calls.append("x")
+        if len(calls) < 3:
+            raise err
+        return "ok"
+
+    with patch("asyncio.sleep") as sleep:
+        assert await func(ConnectionError()) == "ok"
+        assert sleep.call_count == 2
+
+        calls.clear()
+        with pytest.raises(KeyError):
+            await func(KeyError())
+        assert calls == ["x"]
+
+        calls.clear()
+        with pytest.raises(web.HTTPUnauthorized):
+            await func(web.HTTPUnauthorized())
+        assert len(calls) == 1
+
+        calls.clear()
+        sleep.reset_mock()
+        await func(web.HTTPTooManyRequests(headers={"Retry-After": "2"}))
+        assert sleep.call_args_list == [call(2), call(2)]
+
+
+async def test_retry_send() -> None:
+    """Test retrying HTTP responses."""
+    resps = [Mock(status=429, headers={"Retry-After": "1"}), Mock(status=200)]
+    send = AsyncMock(side_effect=resps)
+    with patch("asyncio.sleep") as sleep:
+        assert await RetryPolicy().send(send, idempotent=False) is resps[1]
+    sleep.assert_called_once_with(1)
+    resps[0].release.assert_called_once()
+
+    # 500 is not retried for non-idempotent requests
+    send = AsyncMock(return_value=Mock(status=500))
+    assert (await RetryPolicy().send(send, idempotent=False)).status == 500
+    send.assert_called_once()
+
+
+async def test_request_retry() -> None:
+    """Test AsyncMSAL.request retries throttled requests."""
+    ses = AsyncMSAL({})
+    resps = [Mock(status=503, headers={"Retry-After": "0"}), Mock(status=200)]
+    cses = Mock(request=AsyncMock(side_effect=resps))
+    with (
+        patch.object(AsyncMSAL, "client_session", cses),
+        patch.object(
+            ses, "async_get_token", AsyncMock(return_value={"access_token": "t"})
+        ),
+    ):
+        assert await ses.request("get", "https://graph") is resps[1]
+    assert cses.request.call_count == 2